@@ -1,6 +1,9 @@
 import os
+import sys
 import aiohttp
 import datetime
+import importlib
+import importlib.util
 from typing import Optional
 from traceback import format_exception
 
@@ -8,11 +11,35 @@ import disnake
 from disnake.ext import commands
 
 import utils
-from utils.views import PaginatedHelpCommand
+from utils.paginator import paginator_sessions
+from utils.views import HelpIndex, PaginatedHelpCommand
 
 TOKEN = os.getenv('BOT_TOKEN')
 
 
+def import_homeworks():
+    """Imports ``utils/databases.py/db_homeworks.py``.
+
+    The package's folder is called ``databases.py``, which a plain import can't resolve,
+    so it's registered as ``utils.databases`` by hand first.
+    """
+
+    name = 'utils.databases'
+    if name not in sys.modules:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils', 'databases.py')
+        spec = importlib.util.spec_from_file_location(
+            name, os.path.join(path, '__init__.py'), submodule_search_locations=[path]
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[name]
+            raise
+    return importlib.import_module(f'{name}.db_homeworks')
+
+
 class Scoala(commands.Bot):
     def __init__(self):
         super().__init__(
@@ -31,6 +58,24 @@ class Scoala(commands.Bot):
 
         self.execs = {}
 
+        # Keeps the pending delayed deletions around between restarts.
+        utils.deletion_scheduler.path = os.getenv('PENDING_DELETIONS_PATH')
+        # Where the homework reminders and expiries are announced, unset to not announce them.
+        channel_id = os.getenv('HOMEWORK_CHANNEL_ID')
+        self.homework_channel_id = int(channel_id) if channel_id else None
+        self.help_index = HelpIndex(self)
+
+        # Serves the page buttons of paginators that aren't alive anymore, e.g. after a restart.
+        self.add_listener(paginator_sessions.on_button_click, 'on_button_click')
+        self.add_listener(paginator_sessions.on_button_click, 'on_dropdown')
+
+        # The cached check results have to go as soon as the permissions they depend on change.
+        for event in (
+            'on_member_update', 'on_guild_role_update', 'on_guild_role_delete',
+            'on_guild_channel_update', 'on_guild_channel_delete'
+        ):
+            self.add_listener(getattr(utils.check_cache, event), event)
+
         self.load_extension('jishaku')
         os.environ['JISHAKU_NO_DM_TRACEBACK'] = '1'
         os.environ['JISHAKU_FORCE_PAGINATOR'] = '1'
@@ -45,6 +90,87 @@ class Scoala(commands.Bot):
             if filename.endswith('.py'):
                 self.load_extension(f'reload_cogs.{filename[:-3]}')
 
+    def load_extension(self, name: str, *, package: Optional[str] = None) -> None:
+        super().load_extension(name, package=package)
+        self.help_index.update_extension(self._resolve_name(name, package))
+
+    def unload_extension(self, name: str, *, package: Optional[str] = None) -> None:
+        super().unload_extension(name, package=package)
+        self.help_index.update_extension(self._resolve_name(name, package))
+
+    def reload_extension(self, name: str, *, package: Optional[str] = None) -> None:
+        super().reload_extension(name, package=package)
+        self.help_index.update_extension(self._resolve_name(name, package))
+        # The worker processes still have the old code of the extension imported.
+        utils.recycle_executors()
+
+    async def start_databases(self) -> None:
+        """|coro|
+        Connects to mongo, creates the missing indexes, loads the homework cache
+        and starts firing the expirations. Only done once, ``on_ready`` fires again on reconnects.
+        """
+
+        homeworks = import_homeworks()
+        await homeworks.client.connect()
+        await homeworks.Homework.ensure_indexes()
+        await homeworks.Homework.cache.start()
+
+        # Nothing fires before start, the ones that expired while the bot was down included.
+        homeworks.expirations.add_expire_hook(self.homework_expired)
+        homeworks.expirations.add_reminder_hook(self.homework_reminder)
+        homeworks.expirations.start()
+        self.homeworks = homeworks
+
+    async def announce_homework(self, homework, title: str) -> None:
+        channel = self.get_channel(self.homework_channel_id) if self.homework_channel_id else None
+        if channel is None:
+            return
+
+        # Mongo hands out naive utc datetimes.
+        deadline = homework.expiration_date.replace(tzinfo=datetime.timezone.utc)
+        em = disnake.Embed(color=utils.invisible, title=title, description=homework.assignment)
+        em.add_field(name='Subject', value=homework.subject)
+        em.add_field(name='Deadline', value=f'{utils.format_dt(deadline, "F")} ({utils.format_dt(deadline, "R")})')
+        await channel.send(embed=em)
+
+    async def homework_reminder(self, _id, before: datetime.timedelta) -> None:
+        """|coro|
+        Called by the expiration scheduler when a homework is ``before`` away from its deadline.
+        """
+
+        homework = await self.homeworks.Homework.get(_id)
+        if homework is not None:
+            await self.announce_homework(homework, 'Homework due soon')
+
+    async def homework_expired(self, _id) -> None:
+        """|coro|
+        Called by the expiration scheduler once a homework's deadline passed, including the ones
+        that passed while the bot was down. Deleting it is left to the TTL index, see ``HOMEWORK_TTL``.
+        """
+
+        homework = await self.homeworks.Homework.get(_id)
+        if homework is None or homework.expiration_date is None:
+            return
+
+        await self.announce_homework(homework, 'Homework expired')
+        # So it isn't announced again after a restart.
+        homework.fired_expiration = homework.expiration_date
+        await homework.commit()
+
+    def stop_databases(self) -> None:
+        homeworks = getattr(self, 'homeworks', None)
+        if homeworks is not None:
+            homeworks.expirations.close()
+            homeworks.Homework.cache.close()
+            homeworks.client.close()
+            del self.homeworks
+
+    async def close(self) -> None:
+        await utils.deletion_scheduler.close()
+        self.stop_databases()
+        await super().close()
+        await utils.shutdown_executors()
+
     @property
     def _owner(self) -> disnake.User:
         if self._owner_id:
@@ -61,6 +187,11 @@ class Scoala(commands.Bot):
         if not hasattr(self, '_session'):
             self._session = aiohttp.ClientSession(loop=self.loop)
 
+        utils.deletion_scheduler.load(self)
+
+        if not hasattr(self, 'homeworks'):
+            await self.start_databases()
+
         if not hasattr(self, '_presence_changed'):
             activity = disnake.Activity(type=disnake.ActivityType.watching, name='you study | !comenzi')
             await self.change_presence(status=disnake.Status.dnd, activity=activity)
@@ -2,4 +2,7 @@ from .colours import *  # noqa
 from .context import *  # noqa
 from .formats import *  # noqa
 from .time import *  # noqa
-from .helpers import *  # noqa
\ No newline at end of file
+from .helpers import *  # noqa
+from .checks import *  # noqa
+from .scheduler import *  # noqa
+from .executors import *  # noqa
\ No newline at end of file
@@ -0,0 +1,124 @@
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+import disnake
+from disnake.ext import commands
+
+__all__ = (
+    'CheckCache',
+    'check_cache',
+)
+
+
+class CheckCache:
+    """Remembers for a little while whether a user can run a command in a channel.
+
+    Listing commands (the help command mostly) has to know which of them can be run,
+    and that means awaiting every check of every command. The results are kept for ``ttl``
+    seconds, keyed by ``(user id, channel id, command)``, and the ones that might have changed
+    are dropped as soon as a member's roles, a role's permissions or a channel's overwrites change.
+
+    Parameters
+    ----------
+        ttl: :class:`float`
+            How many seconds a result is kept for.
+        maxsize: :class:`int`
+            How many results are kept at most, the oldest ones are dropped first.
+    """
+
+    def __init__(self, *, ttl: float = 30.0, maxsize: int = 10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._results: OrderedDict[Tuple[int, int, str], Tuple[float, bool]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    @staticmethod
+    def _key(ctx: commands.Context, command: commands.Command) -> Tuple[int, int, str]:
+        return (ctx.author.id, ctx.channel.id, command.qualified_name)
+
+    def get(self, ctx: commands.Context, command: commands.Command) -> Optional[bool]:
+        key = self._key(ctx, command)
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        expires, result = entry
+        if expires <= time.monotonic():
+            del self._results[key]
+            return None
+        return result
+
+    def put(self, ctx: commands.Context, command: commands.Command, result: bool) -> None:
+        key = self._key(ctx, command)
+        self._results[key] = (time.monotonic() + self.ttl, result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    async def can_run(self, ctx: commands.Context, command: commands.Command) -> bool:
+        """|coro|
+        Same as :meth:`commands.Command.can_run`, except that a failed check is just ``False``
+        and the result comes from the cache when there's one.
+        """
+
+        result = self.get(ctx, command)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        try:
+            result = await command.can_run(ctx)
+        except commands.CommandError:
+            result = False
+        self.put(ctx, command, result)
+        return result
+
+    async def filter_commands(self, ctx: commands.Context, cmds: Iterable[commands.Command]) -> List[commands.Command]:
+        """|coro|
+        Returns the commands from ``cmds`` that the author of ``ctx`` can run, in the same order.
+        """
+
+        return [command for command in cmds if await self.can_run(ctx, command)]
+
+    def invalidate(self, *, user_id: Optional[int] = None, channel_id: Optional[int] = None) -> None:
+        """Drops the results of a user, of a channel or, if neither is given, all of them."""
+
+        if user_id is None and channel_id is None:
+            self._results.clear()
+            return
+
+        for key in [
+            key for key in self._results
+            if (user_id is not None and key[0] == user_id) or (channel_id is not None and key[1] == channel_id)
+        ]:
+            del self._results[key]
+
+    # Listeners, added in Scoala.__init__
+
+    async def on_member_update(self, before: disnake.Member, after: disnake.Member) -> None:
+        if before.roles != after.roles:
+            self.invalidate(user_id=after.id)
+
+    async def on_guild_role_update(self, before: disnake.Role, after: disnake.Role) -> None:
+        if before.permissions != after.permissions:
+            # There's no telling which of the cached users have the role.
+            self.invalidate()
+
+    async def on_guild_role_delete(self, role: disnake.Role) -> None:
+        self.invalidate()
+
+    async def on_guild_channel_update(self, before: disnake.abc.GuildChannel, after: disnake.abc.GuildChannel) -> None:
+        if before.overwrites != after.overwrites:
+            self.invalidate(channel_id=after.id)
+
+    async def on_guild_channel_delete(self, channel: disnake.abc.GuildChannel) -> None:
+        self.invalidate(channel_id=channel.id)
+
+
+check_cache = CheckCache()
@@ -31,6 +31,19 @@ class Context(commands.Context):
         except disnake.Forbidden:
             pass
 
+    # delete_after would spawn a sleeping task per message, the scheduler does them all with one timer.
+    async def send(self, *args, delete_after: float | None = None, **kwargs) -> disnake.Message:
+        message = await super().send(*args, **kwargs)
+        if delete_after is not None:
+            await utils.try_delete(message, delay=delete_after)
+        return message
+
+    async def reply(self, *args, delete_after: float | None = None, **kwargs) -> disnake.Message:
+        message = await super().reply(*args, **kwargs)
+        if delete_after is not None:
+            await utils.try_delete(message, delay=delete_after)
+        return message
+
     async def better_reply(self, *args, **kwargs) -> disnake.Message:
         if self.replied_reference is not None:
             try:
@@ -39,7 +52,7 @@ class Context(commands.Context):
                 pass
             return await self.send(*args, reference=self.replied_reference, **kwargs)
         else:
-            return await super().reply(*args, **kwargs)
+            return await self.reply(*args, **kwargs)
 
     async def check_channel(self) -> bool:
         if self.channel.id not in (
@@ -129,10 +142,25 @@ class Context(commands.Context):
             self.command.reset_cooldown(self)
             return await self.reply(f'Îți lipsește un spațiu după ghilimele, nu `{error.char}`')
 
+        elif isinstance(error, commands.CommandNotFound):
+            # Only words are worth suggesting something for, not every "..." or "?!" that starts with a prefix.
+            invoked = self.invoked_with
+            if not invoked or not any(c.isalpha() for c in invoked):
+                return
+
+            suggestions = self.bot.help_index.suggest(invoked, threshold=0.35)
+            if suggestions:
+                await self.reply(
+                    f'Nu există comanda `{utils.remove_markdown(invoked)}`. '
+                    f'Ai vrut să spui {utils.human_join([f"`{name}`" for name in suggestions])}?',
+                    delete_after=10.0,
+                    allowed_mentions=disnake.AllowedMentions.none()
+                )
+            return
+
         elif (
             isinstance(error, commands.TooManyArguments) or
-            isinstance(error, commands.BadArgument) or
-            isinstance(error, commands.CommandNotFound)
+            isinstance(error, commands.BadArgument)
         ):
             return
 
@@ -1,20 +1,52 @@
 import os
-import motor.motor_asyncio
+
+from .loader import DocumentLoader
+from .connection import ClientManager
 
 key = os.getenv('MONGODBKEY')
-cluster = motor.motor_asyncio.AsyncIOMotorClient(key)
-database = cluster['Școală']
+client = ClientManager(
+    key, 'Școală',
+    max_pool_size=int(os.getenv('MONGO_MAX_POOL_SIZE', 100)),
+    min_pool_size=int(os.getenv('MONGO_MIN_POOL_SIZE', 2)),
+    server_selection_timeout=float(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT', 5.0))
+)
+
+
+def __getattr__(name):
+    # These used to be created on import, now the client is only created once it's first needed.
+    if name == 'cluster':
+        return client.client
+    elif name == 'database':
+        return client.database
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 class GetDoc:
+    # Set to a ``DocumentCache`` for the documents that have one.
+    cache = None
+
+    @classmethod
+    def loader(cls) -> DocumentLoader:
+        """The :class:`DocumentLoader` that batches this document's ``get`` calls."""
+
+        loader = cls.__dict__.get('_loader')
+        if loader is None:
+            loader = DocumentLoader(cls)
+            setattr(cls, '_loader', loader)
+        return loader
+
     @classmethod
     async def get(cls, id=938097236024360960):
         """|coro|
         This method is a shortcut for ``await .find_one({'_id': id})``
         If the ``id`` isn't given, then it will use the owner's id by default (938097236024360960)
+        If the document has a cache that is ready, the lookup is served from it instead,
+        otherwise the lookups made at the same time are batched into a single query.
         """
 
-        return await cls.find_one({'_id': id})
+        if cls.cache is not None and cls.cache.ready:
+            return cls.cache.get(id)
+        return await cls.loader().load(id)
 
 
 __all__ = (
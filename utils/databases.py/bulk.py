@@ -0,0 +1,311 @@
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from marshmallow import ValidationError
+from pymongo import DeleteMany, DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+__all__ = (
+    'BulkError',
+    'BulkResult',
+    'BulkWriter',
+    'BulkDoc',
+)
+
+
+class BulkError(NamedTuple):
+    index: int
+    code: Optional[int]
+    message: Any
+
+
+class BulkResult:
+    """The outcome of a bulk operation, item by item.
+
+    Attributes
+    ----------
+        inserted_ids: dict[:class:`int`, Any]
+            The ``_id`` of every inserted item, keyed by the item's index.
+        upserted_ids: dict[:class:`int`, Any]
+            The ``_id`` of every upsert that ended up inserting, keyed by the item's index.
+        matched: :class:`int`
+            How many documents the updates matched.
+        modified: :class:`int`
+            How many documents the updates modified.
+        deleted: :class:`int`
+            How many documents were deleted.
+        errors: list[:class:`BulkError`]
+            The items that failed, either because they didn't validate or because mongo refused them.
+        skipped: list[:class:`int`]
+            The indexes of the items that were never sent, because an ordered operation stopped at an error.
+    """
+
+    def __init__(self):
+        self.inserted_ids: Dict[int, Any] = {}
+        self.upserted_ids: Dict[int, Any] = {}
+        self.matched = 0
+        self.modified = 0
+        self.deleted = 0
+        self.errors: List[BulkError] = []
+        self.skipped: List[int] = []
+        self.round_trips = 0
+
+    def __repr__(self) -> str:
+        return (
+            f'<BulkResult inserted={len(self.inserted_ids)} upserted={len(self.upserted_ids)} '
+            f'modified={self.modified} deleted={self.deleted} errors={len(self.errors)} '
+            f'skipped={len(self.skipped)} round_trips={self.round_trips}>'
+        )
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.skipped
+
+    def _merge(self, details: dict, indexes: List[int], inserts: Dict[int, dict]) -> Optional[int]:
+        # ``indexes`` maps the position of a write in the batch to the position of the item it came from.
+        failed = {error['index'] for error in details.get('writeErrors', ())}
+        for error in details.get('writeErrors', ()):
+            self.errors.append(BulkError(indexes[error['index']], error.get('code'), error.get('errmsg')))
+        for upserted in details.get('upserted', ()):
+            self.upserted_ids[indexes[upserted['index']]] = upserted['_id']
+
+        self.matched += details.get('nMatched', 0)
+        self.modified += details.get('nModified', 0)
+        self.deleted += details.get('nRemoved', 0)
+
+        # Ordered writes stop at the first error, the rest of the batch never ran.
+        stopped = min(failed) if failed and details.get('ordered') else None
+        for position, payload in inserts.items():
+            if position not in failed and (stopped is None or position < stopped):
+                self.inserted_ids[indexes[position]] = payload['_id']
+        if stopped is not None:
+            self.skipped.extend(indexes[stopped + 1:])
+        return stopped
+
+
+class BulkWriter:
+    """Queues writes for a document and sends them in batches of ``flush_every``.
+
+    This is what every ``bulk_*`` method of :class:`BulkDoc` goes through, and can also be used
+    directly (preferably as an async context manager) to stream big imports without keeping them in memory.
+
+    Parameters
+    ----------
+        document:
+            The umongo document to write.
+        ordered: :class:`bool`
+            Whether to stop at the first error, like mongo's ordered bulk writes.
+            Items that come after an error are reported as skipped.
+        flush_every: :class:`int`
+            How many writes to queue before sending them.
+    """
+
+    def __init__(self, document, *, ordered: bool = True, flush_every: int = 1000):
+        self.document = document
+        self.ordered = ordered
+        self.flush_every = flush_every
+        self.result = BulkResult()
+
+        self._count = 0
+        self._ops: List[Any] = []
+        self._indexes: List[int] = []
+        self._inserts: Dict[int, dict] = {}
+        self._instances: Dict[int, Any] = {}
+        self._stopped = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.flush()
+
+    def _next_index(self) -> Optional[int]:
+        index = self._count
+        self._count += 1
+        if self._stopped:
+            self.result.skipped.append(index)
+            return None
+        return index
+
+    def _fail(self, index: int, message) -> None:
+        self.result.errors.append(BulkError(index, None, message))
+        if self.ordered:
+            self._stopped = True
+
+    def _payload(self, index: int, item) -> Tuple[Optional[dict], Any]:
+        try:
+            if not isinstance(item, self.document):
+                item = self.document(**item)
+            item.required_validate()
+            return item.to_mongo(), item
+        except ValidationError as e:
+            self._fail(index, e.messages)
+            return None, None
+
+    async def _queue(self, index: int, op) -> None:
+        self._indexes.append(index)
+        self._ops.append(op)
+        if len(self._ops) >= self.flush_every:
+            await self.flush()
+
+    async def insert(self, item: Union[dict, Any]) -> None:
+        """|coro|
+        Queues the insert of a document, or of a dict with the document's fields.
+        """
+
+        index = self._next_index()
+        if index is None:
+            return
+
+        payload, instance = self._payload(index, item)
+        if payload is not None:
+            self._inserts[len(self._ops)] = payload
+            if not instance.is_created:
+                self._instances[len(self._ops)] = instance
+            await self._queue(index, InsertOne(payload))
+
+    async def upsert(self, item: Union[dict, Any], *, key: Union[str, Sequence[str]] = '_id') -> None:
+        """|coro|
+        Queues an update of the document matching ``key``, which is inserted if it doesn't exist.
+        """
+
+        index = self._next_index()
+        if index is None:
+            return
+
+        keys = (key,) if isinstance(key, str) else tuple(key)
+        payload, _ = self._payload(index, item)
+        if payload is None:
+            return
+
+        missing = [k for k in keys if k not in payload]
+        if missing:
+            self._fail(index, f"Missing the upsert key(s) {', '.join(missing)}")
+            return
+
+        filter = {k: payload[k] for k in keys}
+        update = {k: v for k, v in payload.items() if k != '_id'}
+        await self._queue(index, UpdateOne(filter, {'$set': update}, upsert=True))
+
+    async def delete(self, filter: Union[dict, Any], *, many: bool = False) -> None:
+        """|coro|
+        Queues a delete, ``filter`` can be a mongo filter or just an ``_id``.
+        """
+
+        index = self._next_index()
+        if index is None:
+            return
+
+        if not isinstance(filter, dict):
+            filter = {'_id': filter}
+        await self._queue(index, DeleteMany(filter) if many else DeleteOne(filter))
+
+    async def flush(self) -> None:
+        """|coro|
+        Sends everything that is queued in a single round trip.
+        """
+
+        if not self._ops:
+            return
+
+        ops, indexes, inserts, instances = self._ops, self._indexes, self._inserts, self._instances
+        self._ops, self._indexes, self._inserts, self._instances = [], [], {}, {}
+
+        try:
+            ret = await self.document.collection.bulk_write(ops, ordered=self.ordered)
+        except BulkWriteError as e:
+            details = e.details
+        else:
+            details = ret.bulk_api_result
+        details['ordered'] = self.ordered
+        self.result.round_trips += 1
+
+        stopped = self.result._merge(details, indexes, inserts)
+        if stopped is not None:
+            self._stopped = True
+
+        for position, instance in instances.items():
+            _id = self.result.inserted_ids.get(indexes[position])
+            if _id is not None:
+                # The same bookkeeping umongo's own commit does after an insert.
+                instance._data.set(instance.pk_field, _id)
+                instance.is_created = True
+                instance._data.clear_modified()
+
+
+class BulkDoc:
+    @classmethod
+    def bulk_writer(cls, *, ordered: bool = True, flush_every: int = 1000) -> BulkWriter:
+        """Returns a :class:`BulkWriter` for streaming writes, flushing every ``flush_every`` operations."""
+
+        return BulkWriter(cls, ordered=ordered, flush_every=flush_every)
+
+    @classmethod
+    async def bulk_insert(cls, items: Iterable[Union[dict, Any]], *, ordered: bool = True) -> BulkResult:
+        """|coro|
+        Inserts all the ``items`` (documents or dicts of their fields) in as few round trips as possible.
+        """
+
+        items = list(items)
+        if all(isinstance(item, dict) for item in items):
+            return await cls._insert_many(items, ordered=ordered)
+
+        async with cls.bulk_writer(ordered=ordered) as writer:
+            for item in items:
+                await writer.insert(item)
+        return writer.result
+
+    @classmethod
+    async def _insert_many(cls, items: List[dict], *, ordered: bool) -> BulkResult:
+        # Plain dicts have no instance to update afterwards, so they can go through insert_many.
+        writer = cls.bulk_writer(ordered=ordered)
+        payloads: List[Tuple[int, dict]] = []
+        for item in items:
+            index = writer._next_index()
+            if index is None:
+                continue
+            payload, _ = writer._payload(index, item)
+            if payload is not None:
+                payloads.append((index, payload))
+
+        result = writer.result
+        if not payloads:
+            return result
+
+        try:
+            await cls.collection.insert_many([payload for _, payload in payloads], ordered=ordered)
+        except BulkWriteError as e:
+            details = e.details
+        else:
+            details = {}
+        details['ordered'] = ordered
+        result.round_trips += 1
+        result._merge(details, [index for index, _ in payloads], {i: payload for i, (_, payload) in enumerate(payloads)})
+        return result
+
+    @classmethod
+    async def bulk_upsert(
+        cls,
+        items: Iterable[Union[dict, Any]],
+        *,
+        key: Union[str, Sequence[str]] = '_id',
+        ordered: bool = True
+    ) -> BulkResult:
+        """|coro|
+        Updates the documents matching ``key`` with the ``items``, inserting those that don't exist.
+        """
+
+        async with cls.bulk_writer(ordered=ordered) as writer:
+            for item in items:
+                await writer.upsert(item, key=key)
+        return writer.result
+
+    @classmethod
+    async def bulk_delete(cls, filters: Iterable[Union[dict, Any]], *, ordered: bool = True) -> BulkResult:
+        """|coro|
+        Deletes one document per filter, a filter can also be just an ``_id``.
+        """
+
+        async with cls.bulk_writer(ordered=ordered) as writer:
+            for filter in filters:
+                await writer.delete(filter)
+        return writer.result
@@ -0,0 +1,234 @@
+import asyncio
+import bisect
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+__all__ = (
+    'DocumentCache',
+)
+
+# The codes mongo answers with once a resume token can't be used anymore,
+# at that point the only way to be sure we're current is a full resync.
+RESUME_LOST_CODES = (
+    136,  # CappedPositionLost
+    280,  # ChangeStreamFatalError
+    286,  # ChangeStreamHistoryLost
+)
+
+
+class _Resync(Exception):
+    pass
+
+
+class DocumentCache:
+    """A process-wide, in-memory copy of a whole collection.
+
+    The collection is loaded once and then kept current by consuming a change stream,
+    which means the collection must live on a replica set (a single node ``mongod --replSet``
+    works just fine for local testing).
+
+    Documents are indexed by ``_id``, by every field in ``keys`` and by ``sorted_key``,
+    which is kept sorted so that range lookups don't need a scan.
+    The documents returned are built fresh on every read, so modifying them
+    does not affect the cache.
+    """
+
+    def __init__(self, document, *, keys=('subject',), sorted_key: Optional[str] = 'expiration_date'):
+        self.document = document
+        self.keys = tuple(keys)
+        self.sorted_key = sorted_key
+
+        self._raw: Dict[Any, dict] = {}
+        self._by_key: Dict[str, Dict[Any, set]] = {key: defaultdict(set) for key in self.keys}
+        self._sorted: List[tuple] = []
+        self._listeners: List[Callable[[str, Any, Optional[dict]], None]] = []
+
+        self._resume_token = None
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def __contains__(self, _id) -> bool:
+        return _id in self._raw
+
+    @property
+    def ready(self) -> bool:
+        """Whether the collection has been loaded and the cache can be read from."""
+
+        return self._ready.is_set()
+
+    async def wait_until_ready(self) -> None:
+        await self._ready.wait()
+
+    def add_listener(self, func: Callable[[str, Any, Optional[dict]], None]) -> None:
+        """Registers ``func`` to be called on every change applied to the cache.
+
+        It's called as ``func(operation, _id, raw)`` where operation is one of
+        ``insert``, ``update``, ``delete`` or ``resync``. For ``delete`` the raw
+        document is ``None``, and for ``resync`` both the id and the raw document are.
+        """
+
+        self._listeners.append(func)
+
+    def remove_listener(self, func: Callable[[str, Any, Optional[dict]], None]) -> None:
+        try:
+            self._listeners.remove(func)
+        except ValueError:
+            pass
+
+    async def start(self) -> None:
+        """|coro|
+        Loads the collection and starts following its change stream.
+        Returns once the cache is ready to be read from.
+        """
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch())
+
+        waiter = asyncio.ensure_future(self.wait_until_ready())
+        await asyncio.wait((waiter, self._task), return_when=asyncio.FIRST_COMPLETED)
+        if not waiter.done():
+            # The watcher died before the first load, surface its error.
+            waiter.cancel()
+            self._task.result()
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._ready.clear()
+
+    # Reads
+
+    def get(self, _id):
+        raw = self._raw.get(_id)
+        if raw is not None:
+            return self.document.build_from_mongo(raw)
+
+    def find(self, key: str, value) -> list:
+        """Returns every document whose ``key`` equals ``value``, ``key`` must be one of the indexed keys."""
+
+        ids = self._by_key[key].get(value, ())
+        return [self.document.build_from_mongo(self._raw[_id]) for _id in ids]
+
+    def range(self, start=None, end=None) -> list:
+        """Returns the documents whose ``sorted_key`` is in ``[start, end)``, in order.
+        Documents that don't have that field set are never returned.
+        """
+
+        lo = 0 if start is None else bisect.bisect_left(self._sorted, (start,))
+        hi = len(self._sorted) if end is None else bisect.bisect_left(self._sorted, (end,))
+        return [self.document.build_from_mongo(self._raw[entry[2]]) for entry in self._sorted[lo:hi]]
+
+    def all(self) -> list:
+        return [self.document.build_from_mongo(raw) for raw in self._raw.values()]
+
+    # Writes
+
+    def _sort_entry(self, raw: dict) -> Optional[tuple]:
+        value = raw.get(self.sorted_key) if self.sorted_key else None
+        if value is None:
+            return None
+        # str(_id) breaks the ties between equal values, ids themselves aren't always comparable
+        return (value, str(raw['_id']), raw['_id'])
+
+    def _put(self, raw: dict) -> str:
+        _id = raw['_id']
+        operation = 'update' if _id in self._raw else 'insert'
+        self._discard(_id)
+
+        self._raw[_id] = raw
+        for key in self.keys:
+            self._by_key[key][raw.get(key)].add(_id)
+        entry = self._sort_entry(raw)
+        if entry is not None:
+            bisect.insort(self._sorted, entry)
+        return operation
+
+    def _discard(self, _id) -> bool:
+        raw = self._raw.pop(_id, None)
+        if raw is None:
+            return False
+
+        for key in self.keys:
+            ids = self._by_key[key].get(raw.get(key))
+            if ids is not None:
+                ids.discard(_id)
+                if not ids:
+                    del self._by_key[key][raw.get(key)]
+        entry = self._sort_entry(raw)
+        if entry is not None:
+            index = bisect.bisect_left(self._sorted, entry[:2])
+            if index < len(self._sorted) and self._sorted[index][1] == entry[1]:
+                del self._sorted[index]
+        return True
+
+    def _dispatch(self, operation: str, _id, raw: Optional[dict]) -> None:
+        for listener in self._listeners:
+            listener(operation, _id, raw)
+
+    def _apply(self, change: dict) -> None:
+        operation = change['operationType']
+        if operation in ('insert', 'update', 'replace'):
+            raw = change.get('fullDocument')
+            if raw is None:
+                # The document got deleted before the update could be looked up,
+                # its delete event is right behind this one anyway.
+                return
+            self._dispatch(self._put(raw), raw['_id'], raw)
+        elif operation == 'delete':
+            _id = change['documentKey']['_id']
+            if self._discard(_id):
+                self._dispatch('delete', _id, None)
+        elif operation in ('drop', 'rename', 'dropDatabase', 'invalidate'):
+            raise _Resync()
+
+    async def _load(self) -> None:
+        # Reads go back to mongo while the collection is being reloaded.
+        self._ready.clear()
+        self._raw.clear()
+        for index in self._by_key.values():
+            index.clear()
+        self._sorted.clear()
+
+        async for raw in self.document.collection.find({}):
+            self._put(raw)
+        self._ready.set()
+        self._dispatch('resync', None, None)
+
+    async def _watch(self) -> None:
+        while True:
+            try:
+                async with self.document.collection.watch(
+                    full_document='updateLookup',
+                    resume_after=self._resume_token
+                ) as stream:
+                    # Open the stream before loading, so nothing that happens
+                    # in between the two can be missed.
+                    change = await stream.try_next()
+                    if self._resume_token is None:
+                        await self._load()
+                    if change is not None:
+                        self._apply(change)
+                    self._resume_token = stream.resume_token
+
+                    async for change in stream:
+                        self._apply(change)
+                        self._resume_token = stream.resume_token
+            except _Resync:
+                self._resume_token = None
+            except OperationFailure as e:
+                if e.code not in RESUME_LOST_CODES:
+                    # Nothing we can recover from, stop serving reads from a cache
+                    # that won't be updated anymore.
+                    self._ready.clear()
+                    raise
+                self._resume_token = None
+            except PyMongoError:
+                # Motor already retries resumable errors once, if it still failed
+                # give the server some time before trying again.
+                await asyncio.sleep(5.0)
@@ -0,0 +1,238 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import motor.motor_asyncio
+from pymongo import monitoring
+from umongo.frameworks.motor_asyncio import MotorAsyncIOInstance
+
+__all__ = (
+    'MongoStats',
+    'ClientManager',
+    'LazyInstance',
+)
+
+
+class _Timings:
+    # Keeps the totals plus the last ``size`` samples, which is plenty for a p95.
+
+    def __init__(self, size: int = 512):
+        self.count = 0
+        self.failed = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, ms: float, *, failed: bool = False) -> None:
+        self.count += 1
+        self.failed += failed
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.samples.append(ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        samples = sorted(self.samples)
+        return {
+            'count': self.count,
+            'failed': self.failed,
+            'mean_ms': round(self.total / self.count, 3) if self.count else 0.0,
+            'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3) if samples else 0.0,
+            'max_ms': round(self.max, 3),
+        }
+
+
+class MongoStats(monitoring.CommandListener, monitoring.ConnectionPoolListener):
+    """Collects the latency of every operation and how long connections take to be checked out of the pool.
+
+    The events are published from the driver's threads, hence the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checkout_started: Dict[int, float] = {}
+        self.commands: Dict[str, _Timings] = {}
+        self.checkout = _Timings()
+        self.open = 0
+        self.checked_out = 0
+
+    # Commands
+
+    def _command(self, event, *, failed: bool) -> None:
+        with self._lock:
+            timings = self.commands.get(event.command_name)
+            if timings is None:
+                timings = self.commands[event.command_name] = _Timings()
+            timings.add(event.duration_micros / 1000, failed=failed)
+
+    def started(self, event) -> None:
+        pass
+
+    def succeeded(self, event) -> None:
+        self._command(event, failed=False)
+
+    def failed(self, event) -> None:
+        self._command(event, failed=True)
+
+    # Pool
+
+    def _checked_out(self, *, failed: bool) -> None:
+        started = self._checkout_started.pop(threading.get_ident(), None)
+        if started is not None:
+            with self._lock:
+                self.checkout.add((time.perf_counter() - started) * 1000, failed=failed)
+
+    def connection_check_out_started(self, event) -> None:
+        self._checkout_started[threading.get_ident()] = time.perf_counter()
+
+    def connection_check_out_failed(self, event) -> None:
+        self._checked_out(failed=True)
+
+    def connection_checked_out(self, event) -> None:
+        self._checked_out(failed=False)
+        with self._lock:
+            self.checked_out += 1
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self.open -= 1
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'pool': {'open': self.open, 'checked_out': self.checked_out},
+                'checkout': self.checkout.to_dict(),
+                'commands': {name: timings.to_dict() for name, timings in sorted(self.commands.items())},
+            }
+
+
+class ClientManager:
+    """Owns the motor client, which only gets created the first time it's needed.
+
+    That way importing the documents doesn't connect to anything, and the client
+    is bound to the loop that is running when it's first used rather than whatever loop exists at import.
+
+    Parameters
+    ----------
+        uri: :class:`str`
+            The connection string.
+        database: :class:`str`
+            The name of the database the documents live in.
+        max_pool_size: :class:`int`
+            The most connections the pool opens at once.
+        min_pool_size: :class:`int`
+            How many connections the pool keeps open, and opens right away on :meth:`connect`.
+        server_selection_timeout: :class:`float`
+            How many seconds an operation waits for a suitable server before failing.
+        connect_timeout: :class:`float`
+            How many seconds opening a connection can take.
+    """
+
+    def __init__(
+        self,
+        uri: Optional[str],
+        database: str,
+        *,
+        max_pool_size: int = 100,
+        min_pool_size: int = 0,
+        server_selection_timeout: float = 5.0,
+        connect_timeout: float = 10.0
+    ):
+        self.uri = uri
+        self.database_name = database
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.server_selection_timeout = server_selection_timeout
+        self.connect_timeout = connect_timeout
+
+        self.stats = MongoStats()
+        self._client: Optional[motor.motor_asyncio.AsyncIOMotorClient] = None
+
+    @property
+    def client(self) -> motor.motor_asyncio.AsyncIOMotorClient:
+        if self._client is None:
+            self._client = motor.motor_asyncio.AsyncIOMotorClient(
+                self.uri,
+                maxPoolSize=self.max_pool_size,
+                minPoolSize=self.min_pool_size,
+                serverSelectionTimeoutMS=int(self.server_selection_timeout * 1000),
+                connectTimeoutMS=int(self.connect_timeout * 1000),
+                event_listeners=[self.stats],
+            )
+        return self._client
+
+    @property
+    def database(self) -> motor.motor_asyncio.AsyncIOMotorDatabase:
+        return self.client[self.database_name]
+
+    @property
+    def initialised(self) -> bool:
+        return self._client is not None
+
+    async def connect(self, *, warm_up: bool = True) -> None:
+        """|coro|
+        Creates the client and waits for the server to be reachable.
+        If ``warm_up`` is ``True``, ``min_pool_size`` connections are opened right away
+        so the first commands don't pay for the handshakes.
+        """
+
+        admin = self.client.admin
+        await admin.command('ping')
+        if warm_up and self.min_pool_size > 1:
+            await asyncio.gather(*(admin.command('ping') for _ in range(self.min_pool_size)))
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns the pool and per-operation latency stats, in milliseconds."""
+
+        stats = self.stats.to_dict()
+        stats['pool'].update(max_size=self.max_pool_size, min_size=self.min_pool_size, initialised=self.initialised)
+        return stats
+
+
+class LazyInstance(MotorAsyncIOInstance):
+    """An umongo instance that resolves its database through a :class:`ClientManager` on first use."""
+
+    def __init__(self, manager: ClientManager):
+        self.manager = manager
+        super().__init__()
+
+    @property
+    def db(self):
+        return self.manager.database
+
+    @db.setter
+    def db(self, value):
+        # The database always comes from the manager.
+        pass
+
+    def set_db(self, db):
+        pass
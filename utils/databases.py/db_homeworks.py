@@ -1,18 +1,69 @@
-from . import database, GetDoc
+import os
+import datetime
+
+from pymongo import ASCENDING, IndexModel
+
+from . import client, GetDoc
+from .connection import LazyInstance
+from .cache import DocumentCache
+from .scheduler import ExpirationScheduler
+from .bulk import BulkDoc
+from .indexes import expiration_index, ensure_indexes, collscan_report
 
 from umongo.fields import *
-from umongo.frameworks.motor_asyncio import MotorAsyncIOInstance as Instance
 from umongo.frameworks.motor_asyncio import MotorAsyncIODocument as Document
 
-instance = Instance(database)
+instance = LazyInstance(client)
+
+# How many seconds after its deadline a homework gets deleted by mongo, unset to keep them.
+ttl = os.getenv('HOMEWORK_TTL')
+HOMEWORK_TTL = int(ttl) if ttl else None
 
 
 @instance.register
-class Homework(Document, GetDoc):
+class Homework(Document, GetDoc, BulkDoc):
     subject = StringField(required=True)
     assignment = StringField(required=True)
 
     expiration_date = DateTimeField()
+    # The expiration_date whose expiry was handled, so a restart doesn't handle it again.
+    fired_expiration = DateTimeField()
 
     class Meta:
         collection_name = 'Homeworks'
+        indexes = [
+            IndexModel([('subject', ASCENDING), ('expiration_date', ASCENDING)], name='subject_expiration_date'),
+            expiration_index('expiration_date', ttl=HOMEWORK_TTL),
+        ]
+
+    @classmethod
+    async def ensure_indexes(cls):
+        """|coro|
+        Creates the indexes declared in ``Meta``, only touching the ones that are missing or changed.
+        """
+
+        return await ensure_indexes(cls)
+
+    @classmethod
+    async def index_report(cls):
+        """|coro|
+        Explains the queries the bot runs against this collection, see :func:`collscan_report`.
+        """
+
+        now = datetime.datetime.utcnow()
+        return await collscan_report(cls, [
+            {'_id': None},
+            ({'subject': ''}, [('expiration_date', ASCENDING)]),
+            {'subject': '', 'expiration_date': {'$gte': now}},
+            ({'expiration_date': {'$gte': now}}, [('expiration_date', ASCENDING)]),
+        ])
+
+
+# Started by ``Scoala.start_databases`` once the bot is ready, and stopped in ``Scoala.close``.
+# The expire and reminder hooks are registered there too.
+Homework.cache = DocumentCache(Homework, keys=('subject',), sorted_key='expiration_date')
+
+expirations = ExpirationScheduler(
+    key='expiration_date', reminders=(datetime.timedelta(days=1),), fired_key='fired_expiration'
+)
+expirations.attach(Homework.cache)
@@ -0,0 +1,132 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from pymongo import ASCENDING, IndexModel
+
+__all__ = (
+    'expiration_index',
+    'ensure_indexes',
+    'collscan_report',
+)
+
+# Keys that the server adds to ``index_information`` but never come from a model.
+_SERVER_KEYS = ('key', 'name', 'v', 'ns')
+
+
+def expiration_index(field: str = 'expiration_date', *, ttl: Optional[int] = None) -> IndexModel:
+    """Returns the index for the ``field`` deadline.
+
+    If ``ttl`` is given, it's a TTL index and mongo itself deletes the documents
+    ``ttl`` seconds after their deadline passed. The name doesn't depend on it,
+    so turning the TTL on or off replaces the index instead of adding another one.
+    """
+
+    kwargs = {'name': field}
+    if ttl is not None:
+        kwargs['expireAfterSeconds'] = int(ttl)
+    return IndexModel([(field, ASCENDING)], **kwargs)
+
+
+def _key(spec) -> List[Tuple[str, Any]]:
+    return [(name, int(direction) if isinstance(direction, float) else direction) for name, direction in spec]
+
+
+def _options(spec: dict) -> dict:
+    return {k: v for k, v in spec.items() if k not in _SERVER_KEYS}
+
+
+async def ensure_indexes(document) -> Dict[str, List[str]]:
+    """|coro|
+    Idempotently creates the indexes declared in the ``Meta`` of an umongo document.
+
+    Indexes that already exist with the same key and options are left alone, the ones that
+    exist with the same name or key but different options are dropped and created again.
+
+    Return
+    ------
+        dict[:class:`str`, list[:class:`str`]]
+            The names of the indexes that were ``created`` and ``dropped``.
+    """
+
+    collection = document.collection
+    existing = await collection.index_information()
+    result = {'created': [], 'dropped': []}
+
+    for model in document.indexes:
+        spec = model.document
+        name = spec['name']
+        key = _key(spec['key'].items())
+        options = _options(spec)
+
+        matches = [
+            index_name for index_name, info in existing.items()
+            if index_name == name or (index_name != '_id_' and _key(info['key']) == key)
+        ]
+        if any(
+            index_name == name and
+            _key(existing[index_name]['key']) == key and
+            _options(existing[index_name]) == options
+            for index_name in matches
+        ):
+            continue
+
+        for index_name in matches:
+            await collection.drop_index(index_name)
+            del existing[index_name]
+            result['dropped'].append(index_name)
+
+        await collection.create_indexes([model])
+        existing[name] = {'key': key, **options}
+        result['created'].append(name)
+
+    return result
+
+
+def _stages(plan: dict) -> List[str]:
+    stages = [plan['stage']] if 'stage' in plan else []
+    for child in ('inputStage', 'queryPlan'):
+        if child in plan:
+            stages += _stages(plan[child])
+    for child in plan.get('inputStages', ()):
+        stages += _stages(child)
+    return stages
+
+
+async def collscan_report(
+    document,
+    queries: Sequence[Union[dict, Tuple[dict, list]]]
+) -> List[Dict[str, Any]]:
+    """|coro|
+    Explains every query and reports which of them end up scanning the whole collection.
+
+    Parameters
+    ----------
+        document:
+            The umongo document whose collection to query.
+        queries: Sequence[:class:`dict` | tuple[:class:`dict`, :class:`list`]]
+            The filters to explain, optionally paired with the sort they run with.
+    Return
+    ------
+        list[:class:`dict`]
+            One entry per query with its ``filter``, ``sort``, the winning plan's ``stages``
+            and ``collscan``, which is ``True`` if the query does a COLLSCAN.
+    """
+
+    report = []
+    for query in queries:
+        if isinstance(query, tuple):
+            filter, sort = query
+        else:
+            filter, sort = query, None
+
+        cursor = document.collection.find(filter)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = await cursor.explain()
+        stages = _stages(plan['queryPlanner']['winningPlan'])
+        report.append({
+            'filter': filter,
+            'sort': sort,
+            'stages': stages,
+            'collscan': 'COLLSCAN' in stages
+        })
+    return report
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, Dict
+
+__all__ = (
+    'DocumentLoader',
+)
+
+
+class DocumentLoader:
+    """Coalesces the lookups by ``_id`` made in the same event loop iteration into one query.
+
+    Every :meth:`load` made before the loop gets to run its next callbacks is collected,
+    sent as a single ``{'_id': {'$in': [...]}}`` query, and the results are fanned back out
+    to whoever asked for them. Asking for the same id more than once only fetches it once.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self._pending: Dict[Any, asyncio.Future] = {}
+        self._scheduled = False
+        self._tasks = set()
+
+        self.calls = 0
+        self.keys = 0
+        self.queries = 0
+
+    @property
+    def saved(self) -> int:
+        """How many queries were saved compared to one ``find_one`` per call."""
+
+        return self.calls - self.queries
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {'calls': self.calls, 'keys': self.keys, 'queries': self.queries, 'saved': self.saved}
+
+    async def load(self, _id):
+        """|coro|
+        Returns the document with the given ``_id`` or ``None`` if there isn't one.
+        """
+
+        self.calls += 1
+        future = self._pending.get(_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[_id] = loop.create_future()
+            if not self._scheduled:
+                self._scheduled = True
+                loop.call_soon(self._dispatch)
+
+        # The future is shared between everyone who asked for that id,
+        # one of them being cancelled shouldn't cancel it for the others.
+        raw = await asyncio.shield(future)
+        if raw is not None:
+            return self.document.build_from_mongo(raw)
+
+    def _dispatch(self) -> None:
+        batch, self._pending = self._pending, {}
+        self._scheduled = False
+        task = asyncio.create_task(self._fetch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, batch: Dict[Any, asyncio.Future]) -> None:
+        self.queries += 1
+        self.keys += len(batch)
+        try:
+            if len(batch) == 1:
+                found = await self.document.collection.find_one({'_id': next(iter(batch))})
+                found = {found['_id']: found} if found is not None else {}
+            else:
+                cursor = self.document.collection.find({'_id': {'$in': list(batch)}})
+                found = {raw['_id']: raw async for raw in cursor}
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for _id, future in batch.items():
+            if not future.done():
+                # Raw documents are handed out so every caller builds its own instance.
+                future.set_result(found.get(_id))
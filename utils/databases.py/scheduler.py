@@ -0,0 +1,246 @@
+import asyncio
+import datetime
+import functools
+import heapq
+import itertools
+import traceback
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+__all__ = (
+    'ExpirationScheduler',
+)
+
+ExpireHook = Callable[[Any], Awaitable[None]]
+ReminderHook = Callable[[Any, datetime.timedelta], Awaitable[None]]
+
+
+def _utc(dt: datetime.datetime) -> datetime.datetime:
+    # Mongo hands out naive utc datetimes, so that's what everything gets compared as.
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+class ExpirationScheduler:
+    """A single task that fires hooks when documents reach their deadline.
+
+    The upcoming deadlines are kept in a min-heap, and the task only ever sleeps until the
+    closest one, so there's exactly one wake-up per event no matter how many documents are queued.
+    Besides the expiry itself, a reminder is fired ``before`` every deadline for each of the ``reminders``.
+
+    A deadline that passed while nothing was watching, because the bot was down or the change stream
+    had to resync, still gets its expiry fired once it's seen, as long as it's no more than ``catch_up`` late.
+    Reminders that were missed are skipped. Which expiries fired is remembered until the document
+    is deleted or its deadline changes, and across restarts through ``fired_key``.
+
+    Parameters
+    ----------
+        key: :class:`str`
+            The field that holds the deadline.
+        reminders: Iterable[:class:`datetime.timedelta`]
+            How long before the deadline to fire the reminder hooks.
+        fired_key: Optional[:class:`str`]
+            The field the expire hooks set to the deadline they handled, a document whose
+            deadline equals it isn't scheduled again.
+        catch_up: :class:`datetime.timedelta`
+            How late a missed expiry can still be fired.
+    """
+
+    def __init__(
+        self,
+        *,
+        key: str = 'expiration_date',
+        reminders: Iterable[datetime.timedelta] = (),
+        fired_key: Optional[str] = None,
+        catch_up: datetime.timedelta = datetime.timedelta(days=1)
+    ):
+        self.key = key
+        self.reminders = tuple(reminders)
+        self.fired_key = fired_key
+        self.catch_up = catch_up
+
+        # Entries are [when, seq, _id, before, alive], `before` is None for the expiry itself.
+        # Removed entries are only flagged as dead and skipped once they reach the top.
+        self._heap: List[list] = []
+        self._entries: Dict[Any, List[list]] = {}
+        self._dead = 0
+        self._counter = itertools.count()
+        # _id -> the deadline whose expiry fired.
+        self._fired: Dict[Any, datetime.datetime] = {}
+
+        self._expire_hooks: List[ExpireHook] = []
+        self._reminder_hooks: List[ReminderHook] = []
+
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._firing = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add_expire_hook(self, func: ExpireHook) -> None:
+        """Registers a coroutine function that gets called as ``await func(_id)`` once a document expires."""
+
+        self._expire_hooks.append(func)
+
+    def add_reminder_hook(self, func: ReminderHook) -> None:
+        """Registers a coroutine function that gets called as ``await func(_id, before)``
+        when a document is ``before`` away from expiring.
+        """
+
+        self._reminder_hooks.append(func)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def attach(self, cache) -> None:
+        """Keeps the scheduler in sync with a :class:`DocumentCache`."""
+
+        def deadline(get: Callable[[str], Any]) -> Optional[datetime.datetime]:
+            deadline = get(self.key)
+            if deadline is not None and self.fired_key is not None:
+                fired = get(self.fired_key)
+                if fired is not None and _utc(fired) == _utc(deadline):
+                    # Handled already, maybe before a restart.
+                    return None
+            return deadline
+
+        def on_change(operation: str, _id, raw: Optional[dict]) -> None:
+            if operation == 'resync':
+                self.reset((doc.pk, deadline(functools.partial(getattr, doc))) for doc in cache.range())
+            elif operation == 'delete':
+                self.remove(_id)
+            else:
+                self.schedule(_id, deadline(raw.get))
+
+        cache.add_listener(on_change)
+        if cache.ready:
+            on_change('resync', None, None)
+
+    def _push(self, _id, when: datetime.datetime, before: Optional[datetime.timedelta]) -> None:
+        entry = [when, next(self._counter), _id, before, True]
+        self._entries.setdefault(_id, []).append(entry)
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            # It's sooner than whatever the task is sleeping for.
+            self._wakeup.set()
+
+    def _entries_for(self, _id, deadline: datetime.datetime) -> List[Tuple[datetime.datetime, Optional[datetime.timedelta]]]:
+        now = datetime.datetime.utcnow()
+        if deadline <= now:
+            # Expired while nothing was watching, it fires right away unless it did already.
+            if self._fired.get(_id) == deadline or now - deadline > self.catch_up:
+                return []
+            return [(deadline, None)]
+
+        entries = [(deadline, None)]
+        for before in self.reminders:
+            when = deadline - before
+            if when > now:
+                entries.append((when, before))
+        return entries
+
+    def schedule(self, _id, deadline: Optional[datetime.datetime]) -> None:
+        """Schedules (or reschedules) the expiry of a document. A ``None`` deadline unschedules it."""
+
+        self._discard(_id)
+        if deadline is None:
+            self._fired.pop(_id, None)
+            return
+
+        deadline = _utc(deadline)
+        if self._fired.get(_id, deadline) != deadline:
+            # A new deadline gets its own expiry.
+            del self._fired[_id]
+        for when, before in self._entries_for(_id, deadline):
+            self._push(_id, when, before)
+
+    def remove(self, _id) -> None:
+        """Unschedules a document and forgets whether it expired, e.g. once it's deleted."""
+
+        self._fired.pop(_id, None)
+        self._discard(_id)
+
+    def _discard(self, _id) -> None:
+        for entry in self._entries.pop(_id, ()):
+            entry[-1] = False
+            self._dead += 1
+
+        # Don't let the dead entries pile up forever.
+        if self._dead > 64 and self._dead > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if entry[-1]]
+            heapq.heapify(self._heap)
+            self._dead = 0
+
+    def reset(self, items: Iterable[Tuple[Any, Optional[datetime.datetime]]]) -> None:
+        """Replaces everything that is scheduled with ``items``, an iterable of ``(_id, deadline)`` pairs."""
+
+        self._heap.clear()
+        self._entries.clear()
+        self._dead = 0
+        fired, self._fired = self._fired, {}
+        for _id, deadline in items:
+            if deadline is None:
+                continue
+            deadline = _utc(deadline)
+            if fired.get(_id) == deadline:
+                self._fired[_id] = deadline
+            for when, before in self._entries_for(_id, deadline):
+                entry = [when, next(self._counter), _id, before, True]
+                self._entries.setdefault(_id, []).append(entry)
+                self._heap.append(entry)
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def _pop(self, entry: list) -> None:
+        heapq.heappop(self._heap)
+        entry[-1] = False
+        entries = self._entries.get(entry[2])
+        if entries is not None:
+            entries.remove(entry)
+            if not entries:
+                del self._entries[entry[2]]
+
+    async def _fire(self, _id, before: Optional[datetime.timedelta]) -> None:
+        if before is None:
+            coros = [hook(_id) for hook in self._expire_hooks]
+        else:
+            coros = [hook(_id, before) for hook in self._reminder_hooks]
+
+        for result in await asyncio.gather(*coros, return_exceptions=True):
+            if isinstance(result, Exception):
+                traceback.print_exception(type(result), result, result.__traceback__)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            while self._heap and not self._heap[0][-1]:
+                heapq.heappop(self._heap)
+                self._dead -= 1
+
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            entry = self._heap[0]
+            delay = (entry[0] - datetime.datetime.utcnow()).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._pop(entry)
+            if entry[3] is None:
+                self._fired[entry[2]] = entry[0]
+            # Hooks run on their own, a slow one shouldn't hold back the next deadline.
+            task = asyncio.create_task(self._fire(entry[2], entry[3]))
+            self._firing.add(task)
+            task.add_done_callback(self._firing.discard)
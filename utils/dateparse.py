@@ -0,0 +1,441 @@
+import datetime
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+
+from .fuzzy import fold
+
+__all__ = (
+    'DateMatch',
+    'parse',
+)
+
+# Everything is matched folded, so "mâine", "Maine" and "MÂINE" are all "maine".
+_NUMBERS = {'o': 1, 'un': 1, 'una': 1, 'a': 1, 'an': 1, 'one': 1}
+
+# Abbreviations that are only a unit right after a number, otherwise "a m" would be a minute.
+_SHORT_UNITS = frozenset(('s', 'sec', 'secs', 'm', 'min', 'mins', 'h', 'hr', 'hrs', 'd', 'w', 'mo', 'y', 'yr', 'yrs'))
+
+_UNITS = {
+    **dict.fromkeys(('s', 'sec', 'secs', 'second', 'seconds', 'secunda', 'secunde'), 'seconds'),
+    **dict.fromkeys(('m', 'min', 'mins', 'minute', 'minutes', 'minut'), 'minutes'),
+    **dict.fromkeys(('h', 'hr', 'hrs', 'hour', 'hours', 'ora', 'ore'), 'hours'),
+    **dict.fromkeys(('d', 'day', 'days', 'zi', 'zile'), 'days'),
+    **dict.fromkeys(('w', 'week', 'weeks', 'sapt', 'saptamana', 'saptamani'), 'weeks'),
+    **dict.fromkeys(('mo', 'month', 'months', 'luna', 'luni'), 'months'),
+    **dict.fromkeys(('y', 'yr', 'yrs', 'year', 'years', 'an', 'ani'), 'years'),
+}
+
+_DAYS = {
+    **dict.fromkeys(('azi', 'astazi', 'today'), 0),
+    **dict.fromkeys(('maine', 'tomorrow'), 1),
+    **dict.fromkeys(('poimaine',), 2),
+    **dict.fromkeys(('ieri', 'yesterday'), -1),
+}
+
+_WEEKDAYS = {
+    **dict.fromkeys(('luni', 'lunea', 'monday', 'mon'), 0),
+    **dict.fromkeys(('marti', 'martea', 'tuesday', 'tue', 'tues'), 1),
+    **dict.fromkeys(('miercuri', 'miercurea', 'wednesday', 'wed'), 2),
+    **dict.fromkeys(('joi', 'joia', 'thursday', 'thu', 'thurs'), 3),
+    **dict.fromkeys(('vineri', 'vinerea', 'friday', 'fri'), 4),
+    **dict.fromkeys(('sambata', 'saturday', 'sat'), 5),
+    **dict.fromkeys(('duminica', 'sunday', 'sun'), 6),
+}
+
+_MONTHS = {
+    **dict.fromkeys(('ianuarie', 'ian', 'january', 'jan'), 1),
+    **dict.fromkeys(('februarie', 'feb', 'february'), 2),
+    **dict.fromkeys(('martie', 'mar', 'march'), 3),
+    **dict.fromkeys(('aprilie', 'apr', 'april'), 4),
+    **dict.fromkeys(('mai', 'may'), 5),
+    **dict.fromkeys(('iunie', 'iun', 'june', 'jun'), 6),
+    **dict.fromkeys(('iulie', 'iul', 'july', 'jul'), 7),
+    **dict.fromkeys(('august', 'aug'), 8),
+    **dict.fromkeys(('septembrie', 'sept', 'sep', 'september'), 9),
+    **dict.fromkeys(('octombrie', 'oct', 'october'), 10),
+    **dict.fromkeys(('noiembrie', 'noi', 'nov', 'november'), 11),
+    **dict.fromkeys(('decembrie', 'dec', 'december'), 12),
+}
+
+# "săptămâna viitoare", "next week"...
+_NEXT = {
+    **dict.fromkeys(('saptamana', 'week'), relativedelta(weeks=1)),
+    **dict.fromkeys(('luna', 'month'), relativedelta(months=1)),
+    **dict.fromkeys(('anul', 'year'), relativedelta(years=1)),
+}
+
+# Words that are something else more often than a date, "noi" (we), "mai" (more), "sun"...
+# On their own they're only a date when nothing else is in the text, otherwise they need "pe" or "on" before them.
+_AMBIGUOUS = frozenset(('noi', 'mai', 'mar', 'may', 'march', 'sun', 'sat', 'mon', 'wed'))
+
+# "mâine seară" is at 18:00, the same hours parsedatetime uses for "evening" and the like.
+_PARTS_OF_DAY = {
+    'dimineata': 6,
+    'pranz': 12,
+    **dict.fromkeys(('dupa-amiaza', 'dupamasa', 'dupa-masa'), 13),
+    'seara': 18,
+    'noaptea': 21,
+}
+
+# Words after a date that make it a different one, "3 days ago", "tomorrow evening", "vinerea trecută".
+# Only parsedatetime knows what to do with them, so the whole text is left to it.
+_CONTINUATIONS = frozenset((
+    'ago', 'before', 'after', 'until', 'till', 'since', 'next', 'last', 'past', 'trecut', 'trecuta', 'urma',
+    'noon', 'midnight', 'morning', 'afternoon', 'evening', 'night', 'tonight', 'lunch', 'dinner', 'breakfast', 'eod',
+))
+# Words before a date at the end of the text that do the same, "acum 3 zile" is 3 days ago.
+_LEADING = frozenset(('acum', 'before', 'after', 'until', 'till', 'since', 'last', 'past'))
+
+_RELATIVE_PREFIXES = ('in', 'peste')
+_TIME_PREFIXES = ('la', 'at', 'ora', '@')
+_DATE_PREFIXES = ('pe', 'on', 'in', 'din')
+_CONJUNCTIONS = ('si', 'and', ',')
+_FUTURE = ('viitoare', 'viitor', 'urmatoare', 'urmator')
+
+_AMOUNT_UNIT = re.compile(r'(\d{1,5})([a-z]+)')
+_CLOCK = re.compile(r'(\d{1,2})(?:[:.h](\d{2}))?(am|pm)?')
+_NUMERIC_DATE = re.compile(r'(\d{1,2})[./](\d{1,2})(?:[./](\d{2}|\d{4}))?')
+_ISO_DATE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})')
+_ORDINAL = re.compile(r'(\d{1,2})(?:st|nd|rd|th)?')
+
+_WORD = re.compile(r'\S+')
+# Only the end of the input is searched for a time that ends it, no date takes more words than this.
+_MAX_TRAILING = 8
+
+
+class DateMatch(NamedTuple):
+    # has_time is whether a time of the day was given, like "la 8".
+    dt: datetime.datetime
+    begin: int
+    end: int
+    has_time: bool
+
+
+class _Token(NamedTuple):
+    # end is where the word ends, tail where the punctuation after it does.
+    word: str
+    begin: int
+    end: int
+    tail: int
+
+
+class _Result:
+    # loose is whether the date is made of words that are usually something else, see _AMBIGUOUS.
+    __slots__ = ('offset', 'date', 'clock', 'loose')
+
+    def __init__(self):
+        self.offset: Optional[relativedelta] = None
+        self.date: Optional[datetime.date] = None
+        self.clock: Optional[Tuple[int, int]] = None
+        self.loose = False
+
+
+def _hours_apart(a: int, b: int) -> int:
+    # Around the clock, 23 and 1 are 2 hours apart.
+    return min(abs(a - b), 24 - abs(a - b))
+
+
+def _tokenize(text: str) -> List[_Token]:
+    tokens = []
+    for match in _WORD.finditer(text):
+        raw = match.group()
+        word = raw.rstrip(',.!?;') or raw
+        tokens.append(_Token(fold(word), match.start(), match.start() + len(word), match.end()))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: List[_Token], now: datetime.datetime):
+        self.tokens = tokens
+        self.now = now
+        self.today = now.date()
+
+    def word(self, i: int) -> Optional[str]:
+        return self.tokens[i].word if i < len(self.tokens) else None
+
+    # Relative offsets: "în 3 zile", "peste o oră și 20 de minute", "2 hours and 5 mins"
+
+    def amount(self, i: int) -> Optional[Tuple[relativedelta, int]]:
+        word = self.word(i)
+        if word is None:
+            return None
+
+        match = _AMOUNT_UNIT.fullmatch(word)
+        if match is not None and match.group(2) in _UNITS:
+            return relativedelta(**{_UNITS[match.group(2)]: int(match.group(1))}), i + 1
+
+        if word.isdigit() and len(word) <= 5:
+            number = int(word)
+        elif word in _NUMBERS:
+            number = _NUMBERS[word]
+        else:
+            return None
+
+        j = i + 1
+        if self.word(j) == 'de':
+            # "20 de minute"
+            j += 1
+        unit = self.word(j)
+        if unit not in _UNITS or (unit in _SHORT_UNITS and not word.isdigit()):
+            return None
+        return relativedelta(**{_UNITS[unit]: number}), j + 1
+
+    def relative(self, i: int) -> Optional[Tuple[relativedelta, int]]:
+        j = i + 1 if self.word(i) in _RELATIVE_PREFIXES else i
+        found = self.amount(j)
+        if found is None:
+            return None
+
+        offset, j = found
+        while True:
+            k = j + 1 if self.word(j) in _CONJUNCTIONS else j
+            found = self.amount(k)
+            if found is None:
+                break
+            offset += found[0]
+            j = found[1]
+
+        if self.word(j) in ('from', 'de') and self.word(j + 1) in ('now', 'acum'):
+            j += 2
+        return offset, j
+
+    # Days: "mâine", "vinerea viitoare", "next week", "25 decembrie", "25.12.2026", "2026-12-25"
+
+    def _future(self, date: datetime.date) -> datetime.date:
+        # A date without a year that already passed this year is the one next year.
+        return date if date >= self.today else date.replace(year=date.year + 1)
+
+    def day(self, i: int, *, prefixed: bool = False) -> Optional[Tuple[datetime.date, int]]:
+        word = self.word(i)
+        if word is None:
+            return None
+
+        if word in _DATE_PREFIXES and not prefixed:
+            # "pe vineri", "on friday", "pe 25 decembrie"
+            found = self.day(i + 1, prefixed=True)
+            if found is not None:
+                return found
+
+        if word in _DAYS:
+            return self.today + datetime.timedelta(days=_DAYS[word]), i + 1
+
+        if word in ('next', 'this') and self.word(i + 1) in _WEEKDAYS:
+            ahead = (_WEEKDAYS[self.word(i + 1)] - self.today.weekday() - 1) % 7 + 1
+            return self.today + datetime.timedelta(days=ahead), i + 2
+
+        if word == 'next' and self.word(i + 1) in _NEXT:
+            return self.today + _NEXT[self.word(i + 1)], i + 2
+
+        if word in _NEXT and self.word(i + 1) in _FUTURE:
+            return self.today + _NEXT[word], i + 2
+
+        if word in _WEEKDAYS:
+            # Always the next one, never today.
+            ahead = (_WEEKDAYS[word] - self.today.weekday() - 1) % 7 + 1
+            j = i + 2 if self.word(i + 1) in _FUTURE else i + 1
+            return self.today + datetime.timedelta(days=ahead), j
+        return self.date(i)
+
+    def date(self, i: int) -> Optional[Tuple[datetime.date, int]]:
+        word = self.word(i)
+        if word is None:
+            return None
+
+        try:
+            match = _ISO_DATE.fullmatch(word)
+            if match is not None:
+                return datetime.date(*map(int, match.groups())), i + 1
+
+            match = _NUMERIC_DATE.fullmatch(word)
+            if match is not None:
+                day, month, year = match.groups()
+                if year is None:
+                    return self._future(datetime.date(self.today.year, int(month), int(day))), i + 1
+                year = int(year) + 2000 if len(year) == 2 else int(year)
+                return datetime.date(year, int(month), int(day)), i + 1
+
+            # "25 decembrie [2026]" or "december 25th [2026]"
+            match = _ORDINAL.fullmatch(word)
+            if match is not None and self.word(i + 1) in _MONTHS:
+                day, month, j = int(match.group(1)), _MONTHS[self.word(i + 1)], i + 2
+            elif word in _MONTHS and self.word(i + 1) is not None and _ORDINAL.fullmatch(self.word(i + 1)):
+                day, month, j = int(_ORDINAL.fullmatch(self.word(i + 1)).group(1)), _MONTHS[word], i + 2
+            else:
+                return None
+
+            year = self.word(j)
+            if year is not None and year.isdigit() and len(year) == 4:
+                return datetime.date(int(year), month, day), j + 1
+            return self._future(datetime.date(self.today.year, month, day)), j
+        except ValueError:
+            # 31.02 and the like
+            return None
+
+    def loose(self, i: int, j: int) -> bool:
+        words = [self.word(k) for k in range(i, j)]
+        if words[0] in _DATE_PREFIXES or words[0] in ('next', 'this'):
+            return False
+        # A year or "viitoare" makes it a date whatever the other words are.
+        if any(word in _FUTURE or (word.isdigit() and len(word) == 4) for word in words):
+            return False
+        return any(word in _AMBIGUOUS for word in words)
+
+    # Times: "la 8", "la ora 8:30", "at 8pm", "20:00", "seara", "la 8 seara"
+
+    def clock(self, i: int) -> Optional[Tuple[Tuple[int, int], int]]:
+        j = i
+        prefixed = False
+        while self.word(j) in _TIME_PREFIXES:
+            j += 1
+            prefixed = True
+
+        word = self.word(j)
+        if word is None:
+            return None
+        if word in _PARTS_OF_DAY:
+            return (_PARTS_OF_DAY[word], 0), j + 1
+        match = _CLOCK.fullmatch(word)
+        if match is None:
+            return None
+
+        hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+        j += 1
+        if meridiem is None and self.word(j) in ('am', 'pm'):
+            meridiem = self.word(j)
+            j += 1
+
+        part = self.word(j) if meridiem is None else None
+        if part in _PARTS_OF_DAY:
+            # "la 8 seara" is 20:00 and "la 2 noaptea" 2:00, whichever is closer to that part of the day.
+            j += 1
+            if hour < 12:
+                hour = min(hour, hour + 12, key=lambda h: _hours_apart(h, _PARTS_OF_DAY[part]))
+        # A lone number is only a time if something says it's one.
+        elif not prefixed and match.group(2) is None and meridiem is None:
+            return None
+
+        if meridiem is not None:
+            if not 1 <= hour <= 12:
+                return None
+            hour = hour % 12 + (12 if meridiem == 'pm' else 0)
+        if hour > 23 or minute > 59:
+            return None
+        return (hour, minute), j
+
+    def continues(self, j: int) -> bool:
+        """Whether the word at ``j`` carries on the date before it, see _CONTINUATIONS."""
+
+        word = self.word(j)
+        if word in _CONTINUATIONS:
+            return True
+        # "at noon", "3 zile în urmă". A time after "at" would have been taken already.
+        return word in ('at', '@') or (word == 'in' and self.word(j + 1) in _CONTINUATIONS)
+
+    def expression(self, i: int) -> Optional[Tuple[_Result, int]]:
+        result = _Result()
+        found = self.relative(i)
+        if found is not None:
+            result.offset, j = found
+            clock = self.clock(j)
+            if clock is not None:
+                result.clock, j = clock
+            return result, j
+
+        day = self.day(i)
+        if day is not None:
+            result.date, j = day
+            result.loose = self.loose(i, j)
+            clock = self.clock(j)
+            if clock is not None:
+                result.clock, j = clock
+            return result, j
+
+        clock = self.clock(i)
+        if clock is not None:
+            result.clock, j = clock
+            day = self.day(j)
+            if day is not None:
+                result.date, k = day
+                result.loose = self.loose(j, k)
+                j = k
+            return result, j
+        return None
+
+    def build(self, result: _Result) -> datetime.datetime:
+        now = self.now
+        if result.offset is not None:
+            dt = now + result.offset
+        elif result.date is not None:
+            dt = datetime.datetime.combine(result.date, now.timetz())
+        else:
+            dt = now
+
+        if result.clock is not None:
+            hour, minute = result.clock
+            dt = dt.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if result.offset is None and result.date is None and dt <= now:
+                # "la 8" when it's already past 8 means tomorrow.
+                dt += datetime.timedelta(days=1)
+        return dt
+
+
+def parse(text: str, *, now: datetime.datetime, whole: bool = False) -> Optional[DateMatch]:
+    """Finds a date or time in Romanian or English at the start or the end of ``text``.
+
+    It understands relative offsets ("în 3 zile", "peste o oră", "in 2 hours and 5 mins"),
+    days ("azi", "mâine", "poimâine", "vineri", "luni viitoare", "next friday", "săptămâna viitoare"),
+    dates ("25 decembrie", "december 25th 2026", "25.12", "2026-12-25") and times ("la 8", "la ora 8:30",
+    "at 8pm", "20:00", "mâine seară"), as well as a day and a time together in either order.
+    Dates and times are taken in the same timezone as ``now``, and a time without a day that has
+    already passed today is tomorrow's.
+
+    Nothing is returned when the words next to the date change what it means ("3 days ago",
+    "tomorrow evening", "acum 3 zile"), so parsedatetime can have the whole text. Neither is it when
+    the date is made of words that are usually something else ("noi", "mai", "sun") in the middle
+    of a sentence, they have to be the whole text or come after "pe" or "on".
+
+    Parameters
+    ----------
+        text: :class:`str`
+            The text to look into.
+        now: :class:`datetime.datetime`
+            The time the text is relative to.
+        whole: :class:`bool`
+            Whether the whole text has to be the date.
+    Return
+    ------
+        Optional[:class:`DateMatch`]
+            The datetime along with where it begins and ends in ``text``,
+            or ``None`` if there's nothing understood there.
+    """
+
+    tokens = _tokenize(text)
+    if not tokens:
+        return None
+    parser = _Parser(tokens, now)
+
+    # The longest expression at the start...
+    found = parser.expression(0)
+    if found is not None and (found[1] == len(tokens) or not whole):
+        result, end = found
+        if end < len(tokens) and parser.continues(end):
+            return None
+        if end == len(tokens) or not result.loose:
+            # The punctuation that ends the text is part of the date, "mâine." leaves nothing behind.
+            last = tokens[end - 1]
+            end = last.tail if end == len(tokens) else last.end
+            return DateMatch(parser.build(result), tokens[0].begin, end, result.clock is not None)
+    if whole:
+        return None
+
+    # ...or the longest one that ends the text.
+    for i in range(max(1, len(tokens) - _MAX_TRAILING), len(tokens)):
+        found = parser.expression(i)
+        if found is not None and found[1] == len(tokens):
+            result = found[0]
+            if result.loose or tokens[i - 1].word in _LEADING:
+                return None
+            return DateMatch(parser.build(result), tokens[i].begin, tokens[-1].tail, result.clock is not None)
+    return None
@@ -0,0 +1,199 @@
+import asyncio
+import importlib
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+__all__ = (
+    'ExecutorPool',
+    'executors',
+    'recycle_executors',
+    'shutdown_executors',
+)
+
+# "module:qualname" -> the undecorated function, so worker processes can find it by name.
+_registry: dict[str, Callable] = {}
+
+
+def _register(func: Callable) -> str:
+    """Makes ``func`` callable in the worker processes, raises :class:`TypeError` if it can't be."""
+
+    if func.__name__ == '<lambda>' or '<locals>' in func.__qualname__:
+        raise TypeError(
+            f"{func.__qualname__} can't run in a process pool, only functions defined "
+            "at the top level of a module can be pickled"
+        )
+    if '.' in func.__qualname__:
+        # A method would need ``self`` pickled on every call, and cogs never are.
+        raise TypeError(
+            f"{func.__qualname__} can't run in a process pool, methods aren't supported. "
+            "Move the work to a module level function and call that instead"
+        )
+    if func.__module__ == '__main__':
+        raise TypeError(
+            f"{func.__qualname__} can't run in a process pool since it's defined in '__main__', "
+            "which the worker processes can't import"
+        )
+
+    key = f'{func.__module__}:{func.__qualname__}'
+    _registry[key] = func
+    return key
+
+
+def _call_registered(key: str, args: tuple, kwargs: dict) -> Any:
+    # The decorator replaces the function in its module, so pickle can't find the original by reference.
+    # Importing the module in the worker decorates it again, which puts the original in this registry.
+    func = _registry.get(key)
+    if func is None:
+        importlib.import_module(key.partition(':')[0])
+        func = _registry[key]
+    return func(*args, **kwargs)
+
+
+def _timed(submitted: float, func: Callable, args: tuple, kwargs: dict) -> tuple[float, float, Any]:
+    # Wall clock, since it's compared between processes.
+    started = time.time()
+    result = func(*args, **kwargs)
+    return started - submitted, time.time() - started, result
+
+
+class ExecutorPool:
+    """A named executor, created the first time it's used, that keeps track of how it's doing.
+
+    Parameters
+    ----------
+        name: :class:`str`
+            The name functions select it by.
+        factory: Callable[[:class:`int`], :class:`concurrent.futures.Executor`]
+            Creates the executor, given the number of workers.
+        max_workers: :class:`int`
+            How many workers the executor gets.
+        processes: :class:`bool`
+            Whether the workers are processes, in which case the functions have to be picklable.
+    """
+
+    def __init__(self, name: str, factory: Callable[[int], Executor], max_workers: int, *, processes: bool = False):
+        self.name = name
+        self.factory = factory
+        self.max_workers = max_workers
+        self.processes = processes
+        self._executor: Optional[Executor] = None
+
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.run_time = 0.0
+        self.max_run_time = 0.0
+
+    def __repr__(self) -> str:
+        return f'<ExecutorPool name={self.name!r} max_workers={self.max_workers} in_flight={self.in_flight}>'
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = self.factory(self.max_workers)
+        return self._executor
+
+    @property
+    def queued(self) -> int:
+        """How many calls are waiting for a free worker."""
+
+        return max(self.in_flight - self.max_workers, 0)
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        finished = self.completed or 1
+        return {
+            'queued': self.queued,
+            'running': min(self.in_flight, self.max_workers),
+            'completed': self.completed,
+            'failed': self.failed,
+            'avg_wait': self.wait_time / finished,
+            'max_wait': self.max_wait_time,
+            'avg_run': self.run_time / finished,
+            'max_run': self.max_run_time,
+        }
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """|coro|
+        Runs ``func`` in one of the workers and returns what it returned.
+
+        For process pools, ``func`` is the key :func:`_register` returned.
+        """
+
+        if self.processes:
+            args, kwargs, func = (func, args, kwargs), {}, _call_registered
+
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        try:
+            wait, run, result = await loop.run_in_executor(self.executor, _timed, time.time(), func, args, kwargs)
+        except BrokenProcessPool:
+            # A worker died, e.g. killed for using too much memory. The next call gets a new pool.
+            self.failed += 1
+            self._executor = None
+            raise
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        self.completed += 1
+        self.wait_time += wait
+        self.run_time += run
+        self.max_wait_time = max(self.max_wait_time, wait)
+        self.max_run_time = max(self.max_run_time, run)
+        return result
+
+    def recycle(self) -> None:
+        """Makes the next call start new workers, the ones running now finish what they were given."""
+
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            executor.shutdown(wait=False)
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+_cpus = os.cpu_count() or 1
+
+executors: dict[str, ExecutorPool] = {
+    # Blocking I/O, e.g. files and sync libraries.
+    'io': ExecutorPool('io', lambda n: ThreadPoolExecutor(n, thread_name_prefix='io'), min(32, _cpus + 4)),
+    # Things that must never run at the same time as each other.
+    'serial': ExecutorPool('serial', lambda n: ThreadPoolExecutor(n, thread_name_prefix='serial'), 1),
+    # CPU heavy work like image processing, which would hold the GIL in a thread.
+    'cpu': ExecutorPool('cpu', ProcessPoolExecutor, _cpus, processes=True),
+}
+
+
+def recycle_executors() -> None:
+    """Replaces the workers of the process pools.
+
+    They imported the modules of the functions they run when they started, so after an extension
+    is reloaded they'd keep running the old code under the same name.
+    """
+
+    for pool in executors.values():
+        if pool.processes:
+            pool.recycle()
+
+
+async def shutdown_executors() -> None:
+    """|coro|
+    Shuts down every executor that was used, cancelling the calls that didn't start yet
+    and waiting for the ones that are running.
+    """
+
+    loop = asyncio.get_running_loop()
+    for pool in executors.values():
+        # Waiting for the workers blocks, so it's done off the loop.
+        await loop.run_in_executor(None, pool.shutdown)
@@ -0,0 +1,100 @@
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Any, Dict, Generic, Hashable, List, Set, Tuple, TypeVar
+
+__all__ = (
+    'fold',
+    'trigrams',
+    'TrigramIndex',
+)
+
+T = TypeVar('T', bound=Hashable)
+
+
+def fold(text: str) -> str:
+    """Lowercases the text and strips its diacritics, ``Comandă`` and ``comanda`` fold the same."""
+
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def trigrams(text: str) -> Set[str]:
+    # The padding makes the start of a word count more than its middle, that's where typos are the least likely.
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex(Generic[T]):
+    """Finds the values whose keys look the most like a query.
+
+    Every key is folded with :func:`fold` and split into trigrams, and a search only scores
+    the keys that share at least one trigram with the query, by how many they share out of all
+    the trigrams the two have. A value can have several keys (a command and its aliases)
+    and is only returned once, with the score of its best key.
+    """
+
+    def __init__(self):
+        self._keys: Dict[int, Tuple[str, T]] = {}
+        self._grams: Dict[int, int] = {}
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._by_value: Dict[T, List[int]] = defaultdict(list)
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._by_value)
+
+    def __contains__(self, value: Any) -> bool:
+        return value in self._by_value
+
+    def add(self, key: str, value: T) -> None:
+        folded = fold(key)
+        entry = self._next_id
+        self._next_id += 1
+
+        grams = trigrams(folded)
+        self._keys[entry] = (folded, value)
+        self._grams[entry] = len(grams)
+        for gram in grams:
+            self._postings[gram].add(entry)
+        self._by_value[value].append(entry)
+
+    def remove(self, value: T) -> None:
+        for entry in self._by_value.pop(value, ()):
+            folded, _ = self._keys.pop(entry)
+            del self._grams[entry]
+            for gram in trigrams(folded):
+                entries = self._postings.get(gram)
+                if entries is not None:
+                    entries.discard(entry)
+                    if not entries:
+                        del self._postings[gram]
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._grams.clear()
+        self._postings.clear()
+        self._by_value.clear()
+
+    def search(self, query: str, *, limit: int = 5, threshold: float = 0.3) -> List[Tuple[T, float]]:
+        """Returns at most ``limit`` ``(value, score)`` pairs scoring at least ``threshold``, best first.
+
+        The score goes from 0 to 1, keys that start with the query score
+        at least as much as the share of the key that the query covers.
+        """
+
+        folded = fold(query)
+        grams = trigrams(folded)
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+
+        best: Dict[T, float] = {}
+        for entry, count in shared.items():
+            key, value = self._keys[entry]
+            score = count / (len(grams) + self._grams[entry] - count)
+            if folded and key.startswith(folded):
+                score = max(score, len(folded) / len(key))
+            if score >= threshold and score > best.get(value, 0.0):
+                best[value] = score
+
+        return sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
@@ -4,13 +4,15 @@ import re
 import base64
 import asyncio
 import binascii
+import datetime
 import functools
-from typing import Callable
+from typing import Any, Callable, Optional
 
 import disnake
 from disnake.ext import commands
 
 import utils
+from .executors import _register, executors
 
 __all__ = (
     'time_phaser',
@@ -24,9 +26,12 @@ __all__ = (
     'CooldownByContentChannel',
     'CooldownByContentUser',
     'validate_token',
+    'DeleteSummary',
     'try_delete',
+    'DMReport',
     'try_dm',
     'format_name',
+    'pack_embeds',
     'send_embeds',
     'format_position',
     'TimeConverter'
@@ -60,16 +65,39 @@ def clean_code(content):
         return content
 
 
-def run_in_executor(func: Callable):
-    """Decorator that runs the sync function in the executor."""
+def run_in_executor(func: Optional[Callable] = None, *, executor: str = 'io'):
+    """Decorator that runs the sync function in the executor.
 
-    @functools.wraps(func)
-    async def wrapper(*args, **kwargs):
-        loop = asyncio.get_event_loop()
-        to_run = functools.partial(func, *args, **kwargs)
-        return await loop.run_in_executor(None, to_run)
+    Can be used as ``@run_in_executor`` or ``@run_in_executor(executor='cpu')``.
+    Parameters
+    ----------
+        executor: :class:`str`
+            The name of the pool in :data:`utils.executors.executors` to run in. ``'io'`` is a thread pool
+            for blocking I/O, ``'serial'`` a single thread and ``'cpu'`` a process pool for CPU heavy work.
+    Raises
+    ------
+        :class:`ValueError` if there's no executor with that name.
+        :class:`TypeError` if the executor runs processes and the function can't be pickled,
+        only module level functions (with picklable arguments) can run in one.
+    """
+
+    try:
+        pool = executors[executor]
+    except KeyError:
+        raise ValueError(f"Unknown executor {executor!r}, expected one of {', '.join(map(repr, executors))}") from None
 
-    return wrapper
+    def decorator(func: Callable):
+        target = _register(func) if pool.processes else func
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await pool.run(target, *args, **kwargs)
+
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
 
 
 def clean_inter_content(
@@ -197,16 +225,108 @@ def validate_token(token):
         return True
 
 
+class DeleteSummary:
+    """What :func:`try_delete` did.
+
+    Attributes
+    ----------
+        deleted: list[:class:`int`]
+            The ids of the messages that were deleted.
+        missing: list[:class:`int`]
+            The ids of the messages that didn't exist anymore.
+        failed: list[:class:`int`]
+            The ids of the messages that couldn't be deleted.
+        requests: :class:`int`
+            How many API calls it took.
+    """
+
+    def __init__(self):
+        self.deleted: list[int] = []
+        self.missing: list[int] = []
+        self.failed: list[int] = []
+        self.requests = 0
+
+    def __repr__(self) -> str:
+        return (
+            f'<DeleteSummary deleted={len(self.deleted)} missing={len(self.missing)} '
+            f'failed={len(self.failed)} requests={self.requests}>'
+        )
+
+
+# Discord refuses to bulk delete messages older than 2 weeks, the minute is for the clock skew.
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14, minutes=-1)
+# How many messages that can't be bulk deleted are deleted at the same time.
+DELETE_CONCURRENCY = 5
+
+
+async def _delete_one(message: disnake.PartialMessage, semaphore: asyncio.Semaphore, summary: DeleteSummary):
+    async with semaphore:
+        summary.requests += 1
+        try:
+            await message.delete()
+        except disnake.NotFound:
+            summary.missing.append(message.id)
+        except disnake.HTTPException:
+            summary.failed.append(message.id)
+        else:
+            summary.deleted.append(message.id)
+
+
+async def _delete_in_channel(channel, messages: list, semaphore: asyncio.Semaphore, summary: DeleteSummary):
+    cutoff = disnake.utils.utcnow() - BULK_DELETE_MAX_AGE
+    bulk, singles = [], []
+    for message in messages:
+        if hasattr(channel, 'delete_messages') and disnake.utils.snowflake_time(message.id) > cutoff:
+            bulk.append(message)
+        else:
+            singles.append(message)
+
+    for i in range(0, len(bulk), 100):
+        chunk = bulk[i:i + 100]
+        if len(chunk) == 1:
+            singles.extend(chunk)
+            continue
+
+        summary.requests += 1
+        try:
+            await channel.delete_messages(chunk)
+        except disnake.HTTPException:
+            # Most likely missing the manage messages permission, the bot can still delete its own messages.
+            singles.extend(chunk)
+        else:
+            summary.deleted.extend(message.id for message in chunk)
+
+    await asyncio.gather(*(_delete_one(message, semaphore, summary) for message in singles))
+
+
+async def _delete_messages(messages: list) -> DeleteSummary:
+    summary = DeleteSummary()
+    by_channel: dict[int, tuple[Any, dict[int, Any]]] = {}
+    for message in messages:
+        by_channel.setdefault(message.channel.id, (message.channel, {}))[1][message.id] = message
+
+    semaphore = asyncio.Semaphore(DELETE_CONCURRENCY)
+    await asyncio.gather(*(
+        _delete_in_channel(channel, list(channel_messages.values()), semaphore, summary)
+        for channel, channel_messages in by_channel.values()
+    ))
+    return summary
+
+
 async def try_delete(
     message: disnake.Message | list[disnake.Message] | tuple[disnake.Message] | set[disnake.Message] = None,
     *,
     channel: disnake.TextChannel | disnake.Thread = None,
     message_id: int | list[int] | tuple[int] | set[int] = None,
     delay: float | int = None
-):
+) -> Optional[DeleteSummary]:
     """|coro|
     A helper function that tries to delete a :class:`disnake.Message` object
     while silencing the errors that it may raise.
+
+    The messages are grouped by channel and the ones younger than 2 weeks are bulk deleted,
+    100 per API call. The others are deleted one by one, a few at a time. Message ids are
+    never fetched, a :class:`disnake.PartialMessage` is all it takes to delete one.
     Parameters
     ----------
         message: Optional[:class:`disnake.Message` | list[:class:`disnake.Message`] |
@@ -214,19 +334,21 @@ async def try_delete(
             The message to try and delete, can also be a list of message objects.
             If `channel` and `message_id` is not given, this is required.
         channel: Optional[:class:`disnake.TextChannel` | :class:`disnake.Thread`]
-            The channel from which to fetch the message object. If this is given, `message_id` becomes required.
+            The channel the messages are in. If this is given, `message_id` becomes required.
             This gets ignored if `message` is not ``None``.
         message_id: Optional[:class:`int` | list[:class:`int`] | tuple[:class:`int`] | set[:class:`int`]]
-            The message id for the message object to fetch, can also be a list of message ids.
+            The id of the message to delete, can also be a list of message ids.
             If this is given, `channel` becomes required. This gets ignored if `message` is not ``None``.
         delay: Optional[:class:`float` | :class:`int`]
-            The time to wait in the background before deleting the message.
+            The time to wait before deleting the message. The deletion is handed to
+            :data:`utils.deletion_scheduler`, so it's batched with the others that are due at the same time.
     Raises
     ------
         :class:`TypeError` if the type of an argument or key-word argument isn't any of the required ones.
     Return
     -------
-        ``None``
+        Optional[:class:`DeleteSummary`]
+            What got deleted, or ``None`` if there's a ``delay`` since nothing is deleted yet.
     """
 
     if message is None and channel is None and message_id is None:
@@ -239,33 +361,25 @@ async def try_delete(
         )
 
     if message is not None:
-        if isinstance(message, disnake.Message):
-            try:
-                await message.delete(delay=delay)
-            except disnake.HTTPException:
-                return
+        if isinstance(message, (disnake.Message, disnake.PartialMessage)):
+            messages = [message]
 
         elif isinstance(message, (list, tuple, set)):
-            for i, message in enumerate(message):
-                if not isinstance(message, disnake.Message):
+            messages = list(message)
+            for i, message in enumerate(messages):
+                if not isinstance(message, (disnake.Message, disnake.PartialMessage)):
                     raise TypeError(
                         f"Expected value at index '{i}' in 'message' to be of type 'disnake.Message', "
                         f"not {message.__class__}"
                     )
 
-                try:
-                    await message.delete(delay=delay)
-                except disnake.HTTPException:
-                    pass
-
         else:
             raise TypeError(
                 "Argument 'message' must be of type 'disnake.Message', 'list[disnake.Message]', "
                 f"'tuple[disnake.Message]' or 'set[disnake.Message]', not {message.__class__}"
             )
-        return
 
-    if channel is not None and message_id is None:
+    elif channel is not None and message_id is None:
         raise utils.MissingArgument(
             "If 'channel' is given, 'message_id' is required!"
         )
@@ -283,25 +397,17 @@ async def try_delete(
             )
 
         if isinstance(message_id, int):
-            try:
-                message = await channel.fetch_message(message_id)
-                await message.delete(delay=delay)
-            except disnake.HTTPException:
-                return
+            messages = [channel.get_partial_message(message_id)]
 
         elif isinstance(message_id, (list, tuple, set)):
+            messages = []
             for i, mid in enumerate(message_id):
                 if not isinstance(mid, int):
                     raise TypeError(
                         f"Expected value at index '{i}' in 'message_id' to be of type 'int', "
-                        f"not {message.__class__}"
+                        f"not {mid.__class__}"
                     )
-                try:
-                    message = await channel.fetch_message(mid)
-                    await message.delete(delay=delay)
-                except disnake.HTTPException:
-                    pass
-            return
+                messages.append(channel.get_partial_message(mid))
 
         else:
             raise TypeError(
@@ -309,15 +415,112 @@ async def try_delete(
                 f"'tuple[int]' or 'set[int]' not {message_id.__class__}"
             )
 
+    if delay is not None:
+        utils.deletion_scheduler.schedule(messages, delay)
+        return
+
+    return await _delete_messages(messages)
+
+
+class DMReport:
+    """Who :func:`try_dm` reached.
+
+    Attributes
+    ----------
+        sent: dict[:class:`int`, :class:`disnake.Message`]
+            The messages that were sent, keyed by the user's id.
+        closed: list[:class:`int`]
+            The ids of the users that turned out to have their dms closed.
+        skipped: list[:class:`int`]
+            The ids of the users that were already known to have their dms closed, nothing was sent to them.
+        failed: dict[:class:`int`, :class:`disnake.HTTPException`]
+            The error of every other user that couldn't be dmed.
+    """
+
+    def __init__(self):
+        self.sent: dict[int, disnake.Message] = {}
+        self.closed: list[int] = []
+        self.skipped: list[int] = []
+        self.failed: dict[int, disnake.HTTPException] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f'<DMReport sent={len(self.sent)} closed={len(self.closed)} '
+            f'skipped={len(self.skipped)} failed={len(self.failed)}>'
+        )
+
+
+# How many dms are sent at the same time, disnake already waits for the rate limits
+# so this is only about not queueing hundreds of requests in the same bucket.
+DM_CONCURRENCY = 5
+# How many times to retry a dm that failed because of a rate limit or a discord error.
+DM_RETRIES = 2
+# How long to remember that a user has their dms closed.
+CLOSED_DM_TTL = 6 * 60 * 60
+# Discord's "Cannot send messages to this user".
+CANNOT_DM_USER = 50007
+
+# user id -> when to try them again
+_closed_dms: dict[int, float] = {}
+
+
+class _Backoff:
+    # Shared by everyone in a fan-out, so failures back off the whole broadcast instead of a single user.
+    def __init__(self):
+        self.failures = 0
+        self.until = 0.0
+
+    async def wait(self):
+        delay = self.until - asyncio.get_running_loop().time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def failed(self):
+        self.failures += 1
+        if self.failures > 1:
+            delay = min(0.5 * 2 ** self.failures, 30.0)
+            self.until = max(self.until, asyncio.get_running_loop().time() + delay)
+
+    def succeeded(self):
+        self.failures = 0
+
+
+async def _dm_one(user, args, kwargs, semaphore: asyncio.Semaphore, backoff: _Backoff, report: DMReport):
+    async with semaphore:
+        for attempt in range(DM_RETRIES + 1):
+            await backoff.wait()
+            try:
+                message = await user.send(*args, **kwargs)
+            except disnake.Forbidden as e:
+                if e.code == CANNOT_DM_USER:
+                    _closed_dms[user.id] = asyncio.get_running_loop().time() + CLOSED_DM_TTL
+                    report.closed.append(user.id)
+                else:
+                    report.failed[user.id] = e
+                return
+            except disnake.HTTPException as e:
+                if (e.status == 429 or e.status >= 500) and attempt < DM_RETRIES:
+                    backoff.failed()
+                    continue
+                report.failed[user.id] = e
+                return
+            else:
+                backoff.succeeded()
+                report.sent[user.id] = message
+                return
+
 
 async def try_dm(
     user: disnake.Member | disnake.User | list[disnake.Member | disnake.User] |
     tuple[disnake.Member | disnake.User] | set[disnake.Member | disnake.User],
     *args,
     **kwargs
-):
+) -> DMReport:
     """|coro|
     Try to dm a user or multiple users the same message while silencing whatever error it may raise.
+
+    The dms are sent a few at a time, backing off when discord keeps failing them. Users that have
+    their dms closed are remembered for a while and skipped by the next broadcasts.
     Parameters
     ----------
         user: :class:`disnake.Member` | :class:`disnake.User` |
@@ -332,29 +535,22 @@ async def try_dm(
         :class:`TypeError` if the user isn't a Member or a User object, or a list, tuple or set of those two.
     Return
     ------
-        ``None``
+        :class:`DMReport`
+            Who got the message and who didn't.
     """
 
     if isinstance(user, (disnake.Member, disnake.User)):
-        try:
-            await user.send(*args, **kwargs)
-        except disnake.HTTPException:
-            return
+        users = [user]
 
     elif isinstance(user, (list, tuple, set)):
-        for i, usr in enumerate(user):
+        users = list(user)
+        for i, usr in enumerate(users):
             if not isinstance(usr, (disnake.Member, disnake.User)):
                 raise TypeError(
                     f"Expected value at index '{i}' in 'usr' to be of type "
                     f"'disnake.Member' or 'disnake.User', not {usr.__class__}"
                 )
 
-            try:
-                await usr.send(*args, **kwargs)
-            except disnake.HTTPException:
-                pass
-        return
-
     else:
         raise TypeError(
             "Argument 'user' must be of type 'disnake.Member', 'disnake.User', "
@@ -362,65 +558,127 @@ async def try_dm(
             f"'set[disnake.Member | disnake.User]' not {user.__class__}"
         )
 
+    report = DMReport()
+    now = asyncio.get_running_loop().time()
+    targets = {}
+    for usr in users:
+        if usr.id in targets or usr.id in report.skipped:
+            continue
+        closed_until = _closed_dms.get(usr.id)
+        if closed_until is not None:
+            if closed_until > now:
+                report.skipped.append(usr.id)
+                continue
+            del _closed_dms[usr.id]
+        targets[usr.id] = usr
+
+    semaphore = asyncio.Semaphore(DM_CONCURRENCY)
+    backoff = _Backoff()
+    await asyncio.gather(*(_dm_one(usr, args, kwargs, semaphore, backoff, report) for usr in targets.values()))
+    return report
+
 
 def format_name(user: disnake.Member | disnake.User) -> str:
     return user.display_name + '#' + user.discriminator
 
 
+# Discord's limits for a single message.
+MAX_EMBEDS = 10
+MAX_EMBEDS_SIZE = 6000
+
+_EMBED_DESTINATIONS = (disnake.TextChannel, disnake.Webhook, disnake.Thread, disnake.User, disnake.Member)
+
+
+def pack_embeds(embeds: list[disnake.Embed]) -> list[list[disnake.Embed]]:
+    """Splits the embeds into as few messages as possible without changing their order.
+
+    Every message gets at most 10 embeds that are at most 6000 characters together.
+    Since the order has to stay the same, filling a message until the next embed doesn't fit
+    is already the fewest messages possible. An embed that's too big on its own gets its own message.
+    """
+
+    packed = []
+    current, size = [], 0
+    for embed in embeds:
+        length = len(embed)
+        if current and (len(current) == MAX_EMBEDS or size + length > MAX_EMBEDS_SIZE):
+            packed.append(current)
+            current, size = [], 0
+        current.append(embed)
+        size += length
+    if current:
+        packed.append(current)
+    return packed
+
+
+async def _send_packed(destination, packed: list[list[disnake.Embed]]) -> list[disnake.Message]:
+    # Webhooks don't return the message unless asked to.
+    extra = {'wait': True} if isinstance(destination, disnake.Webhook) else {}
+    messages = []
+    for embeds in packed:
+        try:
+            messages.append(await destination.send(embeds=embeds, **extra))
+        except disnake.HTTPException:
+            # The rest would be out of order, so this destination stops here.
+            break
+    return messages
+
+
 async def send_embeds(
-    destination: disnake.TextChannel | disnake.Webhook | disnake.Thread | disnake.User | disnake.Member,
+    destination: disnake.TextChannel | disnake.Webhook | disnake.Thread | disnake.User | disnake.Member |
+    list[disnake.TextChannel | disnake.Webhook | disnake.Thread | disnake.User | disnake.Member],
     embeds: list[disnake.Embed] | tuple[disnake.Embed] | set[disnake.Embed]
-):
+) -> list[disnake.Message] | list[list[disnake.Message]]:
     """
     Safe sends the embeds to the destination.
+
+    The embeds are packed in as few messages as the 10 embeds and 6000 characters limits allow,
+    and every destination is sent to at the same time, each one getting the messages in order.
     Parameters
     ----------
         destination: :class:`disnake.TextChannel` | :class:`disnake.Webhook`
-        :class:`disnake.Thread` | :class:`disnake.User` | :class:`disnake.Member`
-            The destination where to send the embeds to.
+        :class:`disnake.Thread` | :class:`disnake.User` | :class:`disnake.Member` | list of those
+            The destination(s) where to send the embeds to.
         embeds: list[:class:`disnake.Embed`] | tuple[:class:`disnake.Embed`]
         | set[:class:`disnake.Embed`]
             The embeds to send.
     Return
     ------
-        ``None``
+        list[:class:`disnake.Message`] | list[list[:class:`disnake.Message`]]
+            The messages that were sent, or a list of them for every destination in the
+            same order if a list of destinations was given. If sending fails for a destination,
+            its list stops at the last message that went through.
     """
 
-    if not isinstance(
-        destination,
-        (
-            disnake.TextChannel, disnake.Webhook,
-            disnake.Thread, disnake.User, disnake.Member
-        )
-    ):
+    if isinstance(destination, (list, tuple)):
+        destinations = list(destination)
+        for i, dest in enumerate(destinations):
+            if not isinstance(dest, _EMBED_DESTINATIONS):
+                raise TypeError(
+                    f"Expected value at index '{i}' in 'destination' to be of type 'disnake.TextChannel', "
+                    f"'disnake.Webhook', 'disnake.Thread', 'disnake.User' or 'disnake.Member', not {dest.__class__}"
+                )
+
+    elif not isinstance(destination, _EMBED_DESTINATIONS):
         raise TypeError(
             "Argument 'destination' must be of type 'disnake.TextChannel', 'disnake.Webhook', "
             "'disnake.Thread', 'disnake.User' or 'disnake.Member', "
             f"not {destination.__class__}"
         )
 
-    elif not isinstance(embeds, (list, tuple, set)):
+    else:
+        destinations = None
+
+    if not isinstance(embeds, (list, tuple, set)):
         raise TypeError(
             "Argument 'embeds' must be of type 'list[disnake.Embed]', 'tuple[disnake.Embed]', "
             f"or 'set[disnake.Embed]', not {embeds.__class__}"
         )
 
-    if len(embeds) == 1:
-        await destination.send(embed=embeds[0])
-    elif len(embeds) > 1:
-        count = 0
-        ems = []
-        for em in embeds:
-            ems.append(em)
-            count += 1
-            if count == 10:
-                await destination.send(embeds=ems)
-                count = 0
-                ems = []
-        else:
-            if count != 0:
-                await destination.send(embeds=ems)
-                ems = []
+    packed = pack_embeds(list(embeds))
+    if destinations is None:
+        return await _send_packed(destination, packed)
+    return list(await asyncio.gather(*(_send_packed(dest, packed) for dest in destinations)))
 
 
 def format_position(n: int | str) -> str:
@@ -1,9 +1,15 @@
-from typing import Any, Dict, Optional, List
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, List, Tuple
+from collections import OrderedDict, deque
+from itertools import accumulate
 import asyncio
+import bisect
+import math
+import re
+import traceback
 
 import disnake
 from disnake import MessageInteraction
-from disnake.ext import menus
+from disnake.ext import commands, menus
 
 from utils import Context, try_delete
 
@@ -11,14 +17,331 @@ __all__ = (
     'RoboPages',
     'FieldPageSource',
     'TextPageSource',
+    'TextStreamPageSource',
     'TextPage',
     'SimplePageSource',
     'SimplePages',
     'EmbedPaginator',
     'RawSimplePageSource',
-    'RawSimplePages'
+    'RawSimplePages',
+    'SizedPageSource',
+    'SizedPages',
+    'CursorPageSource',
+    'PaginatorSessions',
+    'paginator_sessions',
 )
 
+_FENCE_LANGUAGE = re.compile(r'[\w+#.-]{1,16}')
+
+SourceFactory = Callable[[commands.Bot, str], menus.PageSource | Awaitable[menus.PageSource]]
+
+
+class _LRUCache(OrderedDict):
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        self.move_to_end(key)
+        return value
+
+    def put(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        self[key] = value
+        self.move_to_end(key)
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+class _CoalescedEdit:
+    """Pushes only the latest state of a message once the clicks settle down.
+
+    Every click schedules an edit ``delay`` seconds later, and a click that comes in before
+    that replaces the scheduled edit instead of adding another one, so spamming a button
+    costs one API call per settled state rather than one per click.
+    """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._edit: Optional[Callable[..., Awaitable[Any]]] = None
+        self._render: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None
+        self._on_error: Optional[Callable[[Exception], Awaitable[Any]]] = None
+        self._deadline = 0.0
+        self._pending = False
+        self._task: Optional[asyncio.Task] = None
+
+    def push(
+        self,
+        edit: Callable[..., Awaitable[Any]],
+        render: Callable[[], Awaitable[Dict[str, Any]]],
+        on_error: Optional[Callable[[Exception], Awaitable[Any]]] = None
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        self._edit = edit
+        self._render = render
+        self._on_error = on_error
+        self._deadline = loop.time() + self.delay
+        self._pending = True
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    def cancel(self) -> None:
+        self._pending = False
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            remaining = self._deadline - loop.time()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+                continue
+
+            self._pending = False
+            edit, render, on_error = self._edit, self._render, self._on_error
+            try:
+                kwargs = await render()
+                if kwargs:
+                    await edit(**kwargs)
+            except (IndexError, disnake.NotFound):
+                # The page doesn't exist after all, or the message is gone.
+                pass
+            except Exception as e:
+                # Anything else, a failed edit included, has to be seen. The click was deferred already,
+                # so nobody else is going to report it.
+                if on_error is None:
+                    traceback.print_exception(type(e), e, e.__traceback__)
+                else:
+                    await on_error(e)
+
+
+def _as_kwargs(value: Any) -> Dict[str, Any]:
+    if isinstance(value, dict):
+        return value
+    elif isinstance(value, str):
+        return {'content': value, 'embed': None}
+    elif isinstance(value, disnake.Embed):
+        return {'embed': value, 'content': None}
+    else:
+        return {}
+
+
+def _clicked_item(view: disnake.ui.View, interaction: MessageInteraction) -> Optional[disnake.ui.Item]:
+    custom_id = interaction.data.custom_id
+    return disnake.utils.find(lambda item: getattr(item, 'custom_id', None) == custom_id, view.children)
+
+
+def _page_custom_id(source_key: Tuple[str, str], author_id: int, action: str, page: int) -> str:
+    # The argument goes last, that way it's the only part that is allowed to have ':' in it.
+    name, arg = source_key
+    return f'pages:{name}:{author_id}:{action}:{page}:{arg}'
+
+
+def _stateless_buttons(
+    source_key: Tuple[str, str],
+    author_id: int,
+    page_number: int,
+    max_pages: Optional[int]
+) -> List[disnake.ui.Button]:
+    # The same buttons a compact RoboPages shows, minus the view behind them.
+    def button(label: str, style: disnake.ButtonStyle, action: str, page: int, disabled: bool = False):
+        return disnake.ui.Button(
+            label=label,
+            style=style,
+            custom_id=_page_custom_id(source_key, author_id, action, page),
+            disabled=disabled
+        )
+
+    last_page = max_pages - 1 if max_pages is not None else -1
+    buttons = []
+    if max_pages is not None and max_pages >= 2:
+        buttons.append(button('≪', disnake.ButtonStyle.grey, 'f', 0, page_number == 0))
+    buttons.append(button('Back', disnake.ButtonStyle.blurple, 'p', page_number - 1, page_number == 0))
+    buttons.append(button('Next', disnake.ButtonStyle.blurple, 'n', page_number + 1, page_number == last_page))
+    if max_pages is not None and max_pages >= 2:
+        buttons.append(button('≫', disnake.ButtonStyle.grey, 'l', last_page, page_number == last_page))
+    buttons.append(button('Quit', disnake.ButtonStyle.red, 'q', page_number))
+    return buttons
+
+
+class _StatelessMenu:
+    # What a page source gets as its menu when a page is rendered without a live view behind it.
+    def __init__(self, bot: commands.Bot, current_page: int):
+        self.bot = bot
+        self.current_page = current_page
+        self.embed = disnake.Embed(colour=disnake.Colour.blurple())
+
+
+class PaginatorSessions:
+    """Keeps track of the pagination views that are alive, and serves the ones that aren't anymore.
+
+    At most ``max_sessions`` views are kept, once there's more than that the one that was
+    used least recently is stopped. Its buttons are turned off, unless it was started with a ``source_key``,
+    in which case they're left as they are and :meth:`on_button_click` keeps serving them.
+
+    The buttons of a view started with a ``source_key`` have custom ids that hold everything needed
+    to show any of its pages, so they keep working after the view is gone and even after a restart,
+    as long as the source was registered with :meth:`register_source`. So does a select whose custom id
+    was made with :meth:`select_custom_id`, the value picked in it becomes the argument of the source.
+
+    Parameters
+    ----------
+        max_sessions: :class:`int`
+            How many views can be alive at the same time.
+    """
+
+    def __init__(self, max_sessions: int = 100):
+        self.max_sessions = max_sessions
+        self._live: OrderedDict[int, disnake.ui.View] = OrderedDict()
+        self._sources: Dict[str, SourceFactory] = {}
+        self._tasks = set()
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def register_source(self, name: str, factory: SourceFactory) -> None:
+        """Registers the page source ``name``.
+
+        ``factory`` is called as ``factory(bot, arg)`` and returns (or is a coroutine that returns)
+        the page source, where ``arg`` is the second element of the view's ``source_key``.
+        It raises :class:`LookupError` if there's nothing to show for ``arg`` anymore.
+        The source must only rely on ``menu.current_page``, ``menu.bot`` and ``menu.embed`` when formatting the pages.
+        """
+
+        if ':' in name:
+            raise ValueError('The name of a page source cannot contain ":".')
+        self._sources[name] = factory
+
+    def get_source(self, name: str) -> Optional[SourceFactory]:
+        return self._sources.get(name)
+
+    @staticmethod
+    def select_custom_id(name: str, author_id: int) -> str:
+        """The custom id of a select that switches the source ``name`` to the value picked in it."""
+
+        return _page_custom_id((name, ''), author_id, 'v', 0)
+
+    def add(self, view: disnake.ui.View) -> None:
+        """Starts tracking a view, must be called once its message was sent."""
+
+        if view.message is None:
+            return
+
+        self._live[view.message.id] = view
+        self._live.move_to_end(view.message.id)
+        while len(self._live) > self.max_sessions:
+            _, evicted = self._live.popitem(last=False)
+            self._evict(evicted)
+
+    def touch(self, view: disnake.ui.View) -> None:
+        if view.message is not None and view.message.id in self._live:
+            self._live.move_to_end(view.message.id)
+
+    def remove(self, view: disnake.ui.View) -> None:
+        if view.message is not None and self._live.get(view.message.id) is view:
+            del self._live[view.message.id]
+
+    def is_live(self, message_id: int) -> bool:
+        view = self._live.get(message_id)
+        return view is not None and not view.is_finished()
+
+    def _evict(self, view: disnake.ui.View) -> None:
+        edits = getattr(view, '_edits', None)
+        if edits is not None:
+            edits.cancel()
+        view.stop()
+        if getattr(view, 'source_key', None) is not None:
+            # The buttons still work, they just go through on_button_click from now on.
+            return
+
+        for item in view.children:
+            if hasattr(item, 'disabled'):
+                item.disabled = True
+        task = asyncio.create_task(self._disable(view))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _disable(self, view: disnake.ui.View) -> None:
+        try:
+            await view.message.edit(view=view)
+        except disnake.HTTPException:
+            pass
+
+    async def on_button_click(self, inter: MessageInteraction) -> None:
+        """The listener that serves the buttons and selects of the views that aren't alive anymore.
+
+        It's added for both ``on_button_click`` and ``on_dropdown``.
+        """
+
+        custom_id = inter.data.custom_id
+        if not custom_id or not custom_id.startswith('pages:') or self.is_live(inter.message.id):
+            return
+
+        try:
+            _, name, author_id, action, page_number, arg = custom_id.split(':', 5)
+            author_id, page_number = int(author_id), int(page_number)
+        except ValueError:
+            return
+
+        if inter.author.id not in (author_id, getattr(inter.bot, '_owner_id', None)):
+            await inter.response.send_message(
+                'This pagination menu cannot be controlled by you, sorry!',
+                ephemeral=True
+            )
+            return
+
+        if action == 'q':
+            await inter.response.defer()
+            await inter.delete_original_message()
+            return
+        elif action == 'v':
+            arg, page_number = inter.values[0], 0
+        elif action not in ('f', 'p', 'n', 'l'):
+            await inter.response.send_message('This button is not available anymore, use the arrows.', ephemeral=True)
+            return
+
+        factory = self._sources.get(name)
+        try:
+            if factory is None:
+                raise LookupError(name)
+            source = await disnake.utils.maybe_coroutine(factory, inter.bot, arg)
+        except LookupError:
+            await inter.response.send_message('This pagination menu has expired, sorry!', ephemeral=True)
+            return
+
+        await source._prepare_once()
+        max_pages = source.get_max_pages()
+        if max_pages is not None:
+            # The source may have shrunk since the buttons were made.
+            page_number = max_pages - 1 if action == 'l' else min(page_number, max_pages - 1)
+        page_number = max(page_number, 0)
+
+        try:
+            page = await source.get_page(page_number)
+        except IndexError:
+            await inter.response.defer()
+            return
+        kwargs = _as_kwargs(await disnake.utils.maybe_coroutine(source.format_page, _StatelessMenu(inter.bot, page_number), page))
+
+        # The other rows (like a select) stay as they are, only the page buttons are made again.
+        rows = [
+            row for row in disnake.ui.ActionRow.rows_from_message(inter.message)
+            if not any(isinstance(item, disnake.ui.Button) for item in row.children)
+        ]
+        if source.is_paginating():
+            rows.append(disnake.ui.ActionRow(*_stateless_buttons((name, arg), author_id, page_number, max_pages)))
+        await inter.response.edit_message(**kwargs, components=rows)
+
+
+paginator_sessions = PaginatorSessions()
+
 
 class RoboPages(disnake.ui.View):
     def __init__(
@@ -29,19 +352,39 @@ class RoboPages(disnake.ui.View):
         check_embeds: bool = True,
         compact: bool = False,
         quit_delete: bool = False,
+        cache_size: int = 8,
+        edit_delay: float = 0.35,
+        source_key: Optional[Tuple[str, str]] = None,
     ):
         super().__init__()
+        self.source_key: Optional[Tuple[str, str]] = self._check_source_key(source_key, ctx.author.id)
+        self._edits = _CoalescedEdit(edit_delay)
+        # Rendered pages, keyed by (source version, page number).
+        self._rendered: _LRUCache = _LRUCache(cache_size)
+        self._source_version: int = 0
         self.source: menus.PageSource = source
         self.check_embeds: bool = check_embeds
         self.ctx: Context = ctx
         self.message: Optional[disnake.Message] = None
         self.current_page: int = 0
+        # The page the last click is going to, the buttons count from it while the edit is pending.
+        self._pending_page: Optional[int] = None
         self.compact: bool = compact
         self.quit_delete: bool = quit_delete
         self.input_lock = asyncio.Lock()
         self.clear_items()
         self.fill_items()
 
+    @staticmethod
+    def _check_source_key(source_key: Optional[Tuple[str, str]], author_id: int) -> Optional[Tuple[str, str]]:
+        if source_key is not None:
+            if ':' in source_key[0]:
+                raise ValueError('The name of a page source cannot contain ":".')
+            # Discord caps custom ids at 100 characters, leave room for the biggest page number.
+            if len(_page_custom_id(source_key, author_id, 'x', 999999)) > 100:
+                raise ValueError('The source key is too long to fit in a custom id.')
+        return source_key
+
     def fill_items(self) -> None:
         if not self.compact:
             self.numbered_page.row = 1
@@ -62,30 +405,96 @@ class RoboPages(disnake.ui.View):
                 self.add_item(self.numbered_page)
             self.add_item(self.stop_pages)
 
+    @property
+    def source(self) -> menus.PageSource:
+        return self._source
+
+    @source.setter
+    def source(self, value: menus.PageSource) -> None:
+        # A new source means none of the rendered pages are valid anymore.
+        self._source = value
+        self._source_version += 1
+        self._rendered.clear()
+
     async def _get_kwargs_from_page(self, page: int) -> Dict[str, Any]:
         value = await disnake.utils.maybe_coroutine(self.source.format_page, self, page)
-        if isinstance(value, dict):
-            return value
-        elif isinstance(value, str):
-            return {'content': value, 'embed': None}
-        elif isinstance(value, disnake.Embed):
-            return {'embed': value, 'content': None}
-        else:
-            return {}
+        return _as_kwargs(value)
+
+    async def _render_page(self, page_number: int) -> Dict[str, Any]:
+        key = (self._source_version, page_number)
+        kwargs = self._rendered.get(key)
+        if kwargs is None:
+            page = await self.source.get_page(page_number)
+            # current_page has to be right while formatting, the sources put it in the footer,
+            # but it may have moved on while the page was being fetched.
+            current_page, self.current_page = self.current_page, page_number
+            try:
+                kwargs = await self._get_kwargs_from_page(page)
+            finally:
+                self.current_page = current_page
+            self._rendered.put(key, kwargs)
+        return dict(kwargs)
+
+    @property
+    def _base_page(self) -> int:
+        return self._pending_page if self._pending_page is not None else self.current_page
 
     async def show_page(self, interaction: MessageInteraction, page_number: int) -> None:
-        page = await self.source.get_page(page_number)
-        self.current_page = page_number
-        kwargs = await self._get_kwargs_from_page(page)
-        self._update_labels(page_number)
-        if kwargs:
-            if interaction.response.is_done():
-                if self.message:
-                    await self.message.edit(**kwargs, view=self)
-            else:
-                await interaction.response.edit_message(**kwargs, view=self)
+        self._pending_page = page_number
+
+        if interaction.response.is_done():
+            if self.message is None:
+                return
+            edit = self.message.edit
+        else:
+            # Acknowledge right away, the edit itself waits for the clicks to settle.
+            await interaction.response.defer()
+            edit = interaction.edit_original_message
+
+        async def render() -> Dict[str, Any]:
+            try:
+                kwargs = await self._render_page(page_number)
+            except Exception:
+                self._pending_page = None
+                raise
+
+            # Only a page that rendered becomes the current one.
+            self._pending_page = None
+            self.current_page = page_number
+            self._update_labels(page_number)
+            if kwargs:
+                kwargs['view'] = self
+            return kwargs
+
+        async def on_error(error: Exception) -> None:
+            await self.on_error(error, _clicked_item(self, interaction), interaction)
+
+        self._edits.push(edit, render, on_error)
+
+    def _update_custom_ids(self, page_number: int) -> None:
+        max_pages = self.source.get_max_pages()
+        last_page = max_pages - 1 if max_pages is not None else -1
+        for item, action, page in (
+            (self.go_to_first_page, 'f', 0),
+            (self.go_to_previous_page, 'p', page_number - 1),
+            (self.go_to_current_page, 'c', page_number),
+            (self.go_to_next_page, 'n', page_number + 1),
+            (self.go_to_last_page, 'l', last_page),
+            (self.numbered_page, 'k', page_number),
+            (self.stop_pages, 'q', page_number),
+        ):
+            item.custom_id = _page_custom_id(self.source_key, self.ctx.author.id, action, page)
+
+    def refresh(self, components) -> None:
+        # The custom ids of a keyed view change with every page, so a message update that raced an edit
+        # wouldn't match them and would swap the buttons for plain ones. The view has the latest state anyway.
+        if self.source_key is None:
+            super().refresh(components)
 
     def _update_labels(self, page_number: int) -> None:
+        if self.source_key is not None:
+            self._update_custom_ids(page_number)
+
         self.go_to_first_page.disabled = page_number == 0
         if self.compact:
             max_pages = self.source.get_max_pages()
@@ -113,18 +522,16 @@ class RoboPages(disnake.ui.View):
 
     async def show_checked_page(self, interaction: MessageInteraction, page_number: int) -> None:
         max_pages = self.source.get_max_pages()
-        try:
-            if max_pages is None:
-                # If it doesn't give maximum pages, it cannot be checked
-                await self.show_page(interaction, page_number)
-            elif max_pages > page_number >= 0:
-                await self.show_page(interaction, page_number)
-        except IndexError:
-            # An error happened that can be handled, so ignore it.
-            pass
+        # A page that turns out not to exist is dropped when it's rendered, see show_page.
+        if max_pages is None:
+            # If it doesn't give maximum pages, it cannot be checked
+            await self.show_page(interaction, page_number)
+        elif max_pages > page_number >= 0:
+            await self.show_page(interaction, page_number)
 
     async def interaction_check(self, interaction: MessageInteraction) -> bool:
         if interaction.user and interaction.user.id in (self.ctx.bot._owner_id, self.ctx.author.id):
+            paginator_sessions.touch(self)
             return True
         await interaction.response.send_message(
             'This pagination menu cannot be controlled by you, sorry!',
@@ -132,8 +539,15 @@ class RoboPages(disnake.ui.View):
         )
         return False
 
+    def stop(self) -> None:
+        paginator_sessions.remove(self)
+        super().stop()
+
     async def on_timeout(self) -> None:
-        await self.message.edit(view=None)
+        paginator_sessions.remove(self)
+        self._edits.cancel()
+        if self.source_key is None:
+            await self.message.edit(view=None)
 
     async def on_error(
         self, error: Exception, item: disnake.ui.Item, interaction: MessageInteraction
@@ -144,7 +558,7 @@ class RoboPages(disnake.ui.View):
             await interaction.response.send_message(
                 'An unknown error occurred, sorry', ephemeral=True
             )
-        await self.ctx.bot.inter_reraise(self.ctx.bot, interaction, item, error)
+        await self.ctx.bot.inter_reraise(interaction, item, error)
 
     async def start(self, *, ref: bool = False) -> None:
         if self.check_embeds and not self.ctx.channel.permissions_for(self.ctx.me).embed_links:
@@ -152,13 +566,13 @@ class RoboPages(disnake.ui.View):
             return
 
         await self.source._prepare_once()
-        page = await self.source.get_page(0)
-        kwargs = await self._get_kwargs_from_page(page)
+        kwargs = await self._render_page(0)
         self._update_labels(0)
         if ref is False:
             self.message = await self.ctx.send(**kwargs, view=self)
         else:
             self.message = await self.ctx.send(**kwargs, view=self, reference=self.ctx.replied_reference)
+        paginator_sessions.add(self)
 
     @disnake.ui.button(label='≪', style=disnake.ButtonStyle.grey)
     async def go_to_first_page(self, button: disnake.ui.Button, interaction: MessageInteraction):
@@ -170,7 +584,7 @@ class RoboPages(disnake.ui.View):
     async def go_to_previous_page(self, button: disnake.ui.Button, interaction: MessageInteraction):
         """Go to the previous page."""
 
-        await self.show_checked_page(interaction, self.current_page - 1)
+        await self.show_checked_page(interaction, self._base_page - 1)
 
     @disnake.ui.button(label='Current', style=disnake.ButtonStyle.grey, disabled=True)
     async def go_to_current_page(self, button: disnake.ui.Button, interaction: MessageInteraction):
@@ -180,7 +594,7 @@ class RoboPages(disnake.ui.View):
     async def go_to_next_page(self, button: disnake.ui.Button, interaction: MessageInteraction):
         """Go to the next page."""
 
-        await self.show_checked_page(interaction, self.current_page + 1)
+        await self.show_checked_page(interaction, self._base_page + 1)
 
     @disnake.ui.button(label='≫', style=disnake.ButtonStyle.grey)
     async def go_to_last_page(self, button: disnake.ui.Button, interaction: MessageInteraction):
@@ -226,6 +640,7 @@ class RoboPages(disnake.ui.View):
     async def stop_pages(self, button: disnake.ui.Button, interaction: MessageInteraction):
         """Stops the pagination session."""
 
+        self._edits.cancel()
         await interaction.response.defer()
         await interaction.delete_original_message()
         if self.quit_delete:
@@ -241,17 +656,19 @@ class FieldPageSource(menus.ListPageSource):
         self.embed = disnake.Embed(colour=disnake.Colour.blurple())
 
     async def format_page(self, menu, entries):
-        self.embed.clear_fields()
+        # Every page gets its own embed, the pages that were already rendered are kept around.
+        embed = self.embed.copy()
+        embed.clear_fields()
 
         for key, value in entries:
-            self.embed.add_field(name=key, value=value, inline=False)
+            embed.add_field(name=key, value=value, inline=False)
 
         maximum = self.get_max_pages()
         if maximum > 1:
             text = f'Page {menu.current_page + 1}/{maximum} ({len(self.entries)} entries)'
-            self.embed.set_footer(text=text)
+            embed.set_footer(text=text)
 
-        return self.embed
+        return embed
 
 
 class TextPageSource(menus.ListPageSource):
@@ -263,19 +680,221 @@ class TextPageSource(menus.ListPageSource):
         self.has_footer = has_footer
 
     async def format_page(self, menu, entries):
+        embed = menu.embed.copy()
         maximum = self.get_max_pages()
         if maximum > 1:
             fmt = f'Page {menu.current_page + 1}/{maximum}'
             if self.has_footer is True:
-                menu.embed.title = fmt
+                embed.title = fmt
+            else:
+                embed.set_footer(text=fmt)
+
+        embed.description = f'{self.prefix}\n{entries}\n{self.suffix}'
+        return embed
+
+
+class _PageBuilder:
+    # Joins lines into a page while keeping track of the code block they're in,
+    # so a page that ends inside one closes it and the next one opens it again.
+    def __init__(self, size: int, fence: Optional[str]):
+        self.size = size
+        self.fence = fence
+        self.lines: List[str] = []
+        self.count = 0
+        self.length = 0
+        if fence is not None:
+            self.lines.append(f'```{fence}')
+            self.length = len(self.lines[0]) + 1
+
+    @staticmethod
+    def toggle(fence: Optional[str], line: str) -> Optional[str]:
+        if line.count('```') % 2 == 0:
+            return fence
+        if fence is not None:
+            return None
+        language = line.rsplit('```', 1)[1].strip()
+        return language if _FENCE_LANGUAGE.fullmatch(language) else ''
+
+    def add(self, line: str) -> bool:
+        fence = self.toggle(self.fence, line)
+        closing = 4 if fence is not None else 0
+        if self.count and self.length + len(line) + 1 + closing > self.size:
+            return False
+
+        self.lines.append(line)
+        self.count += 1
+        self.length += len(line) + 1
+        self.fence = fence
+        return True
+
+    def finish(self) -> str:
+        text = '\n'.join(self.lines)
+        if self.fence is not None:
+            text += '\n```'
+        return text
+
+
+class TextStreamPageSource(menus.PageSource):
+    """A page source that splits a big text into pages as they're visited.
+
+    ``text`` can be a string or an iterator of lines (a file, a generator...), it's split on line
+    boundaries into pages that fit in the embed's description, and lines that are too long on
+    their own are split wherever they have to be. Code blocks that span several pages are closed
+    at the end of a page and opened again, with the same language, at the start of the next one.
+
+    Nothing past the furthest page visited is read. For a string only where each page starts
+    is remembered, and the page is cut out of it again when needed, while the pages pulled from
+    an iterator have to be kept since it can't be rewound. The number of pages isn't known
+    until the end of the text is reached, until then :meth:`get_max_pages` returns ``None``.
+    """
+
+    # Leaves room for closing and reopening a code block on a page made of a single cut line.
+    _MARGIN = 32
+
+    def __init__(
+        self,
+        text,
+        *,
+        prefix: str = '',
+        suffix: str = '',
+        has_footer: bool = False,
+        max_size: int = 4096
+    ):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.has_footer = has_footer
+        # The prefix and the suffix go on their own lines around the page.
+        self.max_size = max_size - len(prefix) - len(suffix) - 2
+        self._line_limit = self.max_size - self._MARGIN
+        if self._line_limit <= 0:
+            raise ValueError('The prefix and suffix leave no room for the text.')
+
+        self._max_pages: Optional[int] = None
+        if isinstance(text, str):
+            self._text: Optional[str] = text
+            # (offset, code block language) of every page found so far.
+            self._starts: List[Tuple[int, Optional[str]]] = [(0, None)]
+        else:
+            self._text = None
+            self._lines = iter(text)
+            self._pending: deque = deque()
+            self._pages: List[str] = []
+            self._fence: Optional[str] = None
+
+    async def prepare(self):
+        # Reading the first page is enough to know whether there's a second one.
+        await self.get_page(0)
+
+    def is_paginating(self) -> bool:
+        return self._max_pages != 1
+
+    def get_max_pages(self) -> Optional[int]:
+        return self._max_pages
+
+    async def get_page(self, page_number: int) -> str:
+        if page_number < 0:
+            raise IndexError(page_number)
+        if self._text is not None:
+            return self._text_page(page_number)
+        return self._stream_page(page_number)
+
+    # Strings
+
+    def _read_line(self, pos: int) -> Tuple[str, int]:
+        end = self._text.find('\n', pos, pos + self._line_limit)
+        if end != -1:
+            return self._text[pos:end], end + 1
+        end = min(pos + self._line_limit, len(self._text))
+        if end < len(self._text) and self._text[end] == '\n':
+            return self._text[pos:end], end + 1
+        return self._text[pos:end], end
+
+    def _build(self, page_number: int) -> str:
+        pos, fence = self._starts[page_number]
+        builder = _PageBuilder(self.max_size, fence)
+        while pos < len(self._text):
+            line, next_pos = self._read_line(pos)
+            if not builder.add(line):
+                break
+            pos = next_pos
+
+        if page_number == len(self._starts) - 1 and self._max_pages is None:
+            if pos < len(self._text):
+                self._starts.append((pos, builder.fence))
+            else:
+                self._max_pages = len(self._starts)
+        return builder.finish()
+
+    def _text_page(self, page_number: int) -> str:
+        while page_number >= len(self._starts):
+            if self._max_pages is not None:
+                raise IndexError(page_number)
+            self._build(len(self._starts) - 1)
+        return self._build(page_number)
+
+    # Iterators
+
+    def _pieces(self, line: str) -> List[str]:
+        pieces = []
+        for part in line.rstrip('\n').split('\n'):
+            pieces.extend(part[i:i + self._line_limit] for i in range(0, max(len(part), 1), self._line_limit))
+        return pieces
+
+    def _pull(self) -> None:
+        builder = _PageBuilder(self.max_size, self._fence)
+        while True:
+            if not self._pending:
+                try:
+                    line = next(self._lines)
+                except StopIteration:
+                    self._lines = None
+                    break
+                self._pending.extend(self._pieces(line))
+            if not builder.add(self._pending[0]):
+                break
+            self._pending.popleft()
+
+        if builder.count or not self._pages:
+            self._pages.append(builder.finish())
+            self._fence = builder.fence
+        if self._lines is None and not self._pending:
+            self._max_pages = len(self._pages)
+            return
+
+        # Peek at the next line, so the last page is known to be the last as soon as it's pulled.
+        if not self._pending:
+            try:
+                self._pending.extend(self._pieces(next(self._lines)))
+            except StopIteration:
+                self._lines = None
+                self._max_pages = len(self._pages)
+
+    def _stream_page(self, page_number: int) -> str:
+        while page_number >= len(self._pages):
+            if self._max_pages is not None:
+                raise IndexError(page_number)
+            self._pull()
+        return self._pages[page_number]
+
+    async def format_page(self, menu, entries):
+        embed = menu.embed.copy()
+        maximum = self.get_max_pages()
+        if maximum != 1:
+            fmt = f'Page {menu.current_page + 1}/{maximum if maximum is not None else "?"}'
+            if self.has_footer is True:
+                embed.title = fmt
             else:
-                menu.embed.set_footer(text=fmt)
+                embed.set_footer(text=fmt)
 
-        menu.embed.description = f'{self.prefix}\n{entries}\n{self.suffix}'
-        return menu.embed
+        embed.description = f'{self.prefix}\n{entries}\n{self.suffix}'
+        return embed
 
 
 class TextPage(RoboPages):
+    """Paginates text. ``entries`` is either a list of the already split pages,
+    or a string or an iterator of lines, which are split with :class:`TextStreamPageSource`.
+    """
+
     def __init__(
         self,
         ctx,
@@ -289,14 +908,22 @@ class TextPage(RoboPages):
         has_footer = False
         if footer is not None:
             has_footer = True
-        super().__init__(
-            TextPageSource(entries, prefix=prefix, suffix=suffix, has_footer=has_footer),
-            ctx=ctx, compact=True, quit_delete=quit_delete
-        )
+        if isinstance(entries, (list, tuple)):
+            source = TextPageSource(entries, prefix=prefix, suffix=suffix, has_footer=has_footer)
+        else:
+            source = TextStreamPageSource(entries, prefix=prefix, suffix=suffix, has_footer=has_footer)
+        super().__init__(source, ctx=ctx, compact=True, quit_delete=quit_delete)
         self.embed = disnake.Embed()
         if footer is not None:
             self.embed.set_footer(text=footer)
 
+    async def start(self, *, ref: bool = False) -> None:
+        # A streamed text only knows if it fits on a single page once it's prepared.
+        await self.source._prepare_once()
+        if not self.source.is_paginating():
+            self.clear_items()
+        await super().start(ref=ref)
+
 
 class SimplePageSource(menus.ListPageSource):
     def __init__(self, entries, *, per_page=12):
@@ -308,13 +935,14 @@ class SimplePageSource(menus.ListPageSource):
         for index, entry in enumerate(entries, start=menu.current_page * self.per_page):
             pages.append(f'{index + 1}. {entry}')
 
+        embed = menu.embed.copy()
         maximum = self.get_max_pages()
         if maximum > 1:
             footer = f'Page {menu.current_page + 1}/{maximum} ({len(self.entries)} entries)'
-            menu.embed.set_footer(text=footer)
+            embed.set_footer(text=footer)
 
-        menu.embed.description = '\n'.join(pages)
-        return menu.embed
+        embed.description = '\n'.join(pages)
+        return embed
 
 
 class SimplePages(RoboPages):
@@ -339,13 +967,14 @@ class RawSimplePageSource(menus.ListPageSource):
         for index, entry in enumerate(entries, start=menu.current_page * self.per_page):
             pages.append(str(entry))
 
+        embed = menu.embed.copy()
         maximum = self.get_max_pages()
         if maximum > 1:
             footer = f'Page {menu.current_page + 1}/{maximum} ({len(self.entries)} entries)'
-            menu.embed.set_footer(text=footer)
+            embed.set_footer(text=footer)
 
-        menu.embed.description = '\n'.join(pages)
-        return menu.embed
+        embed.description = '\n'.join(pages)
+        return embed
 
 
 class RawSimplePages(RoboPages):
@@ -358,22 +987,231 @@ class RawSimplePages(RoboPages):
         self.embed = disnake.Embed(colour=color)
 
 
+class SizedPageSource(menus.PageSource):
+    """A page source that fits as many entries on a page as Discord's embed limits allow.
+
+    Entries are either strings, which become lines of the description, or ``(name, value)``
+    tuples, which become fields. They're packed greedily in order, a page ends right before the
+    entry that would make it go over 4096 characters of description, 6000 characters in total
+    or 25 fields. The page boundaries are worked out once from the prefix sums of the entries'
+    sizes, so getting a page never looks at more than the entries on it.
+
+    Parameters
+    ----------
+        entries: Sequence[:class:`str` | tuple[:class:`str`, :class:`str`]]
+            The entries to paginate.
+        fields: :class:`bool`
+            Whether the entries are ``(name, value)`` fields instead of lines.
+        numbered: :class:`bool`
+            Whether to number the lines, ignored for fields.
+        max_per_page: Optional[:class:`int`]
+            The most entries a page can have, regardless of their size.
+        reserved: :class:`int`
+            How many characters the rest of the embed (title, author, etc.) takes up.
+    """
+
+    DESCRIPTION_LIMIT = 4096
+    TOTAL_LIMIT = 6000
+    FIELD_LIMIT = 25
+    FIELD_NAME_LIMIT = 256
+    FIELD_VALUE_LIMIT = 1024
+    # Room for the "Page x/y (n entries)" footer.
+    FOOTER_SIZE = 64
+
+    def __init__(
+        self,
+        entries,
+        *,
+        fields: bool = False,
+        numbered: bool = False,
+        max_per_page: Optional[int] = None,
+        reserved: int = 0
+    ):
+        self.entries = entries
+        self.fields = fields
+        self.numbered = numbered and not fields
+
+        if fields:
+            self.budget = self.TOTAL_LIMIT - self.FOOTER_SIZE - reserved
+            max_per_page = min(max_per_page or self.FIELD_LIMIT, self.FIELD_LIMIT)
+        else:
+            self.budget = min(self.DESCRIPTION_LIMIT, self.TOTAL_LIMIT - self.FOOTER_SIZE - reserved)
+        self.max_per_page = max_per_page
+
+        # sizes[i] is how much entries[:i] take up, a page is then a range of entries
+        # whose sizes fit in the budget, found with a bisect instead of adding them up again.
+        sizes = list(accumulate((self._size(i, entries[i]) for i in range(len(entries))), initial=0))
+        self._offsets: List[int] = [0]
+        start = 0
+        while start < len(entries):
+            end = bisect.bisect_right(sizes, sizes[start] + self.budget, lo=start + 1) - 1
+            end = max(end, start + 1)
+            if max_per_page is not None:
+                end = min(end, start + max_per_page)
+            self._offsets.append(end)
+            start = end
+
+    def _size(self, index: int, entry) -> int:
+        if self.fields:
+            name, value = entry
+            size = min(len(str(name)), self.FIELD_NAME_LIMIT) + min(len(str(value)), self.FIELD_VALUE_LIMIT)
+        else:
+            # The line plus its newline.
+            size = len(self._line(index, entry)) + 1
+        # Something that's too big on its own still gets a page, it's cut when formatted.
+        return min(size, self.budget)
+
+    def _line(self, index: int, entry) -> str:
+        return f'{index + 1}. {entry}' if self.numbered else str(entry)
+
+    def is_paginating(self) -> bool:
+        return len(self._offsets) > 2
+
+    def get_max_pages(self) -> int:
+        return max(1, len(self._offsets) - 1)
+
+    async def get_page(self, page_number: int) -> List[Tuple[int, Any]]:
+        if page_number == 0 and not self.entries:
+            # There's always at least one page, even if it's empty.
+            return []
+        if not 0 <= page_number < len(self._offsets) - 1:
+            raise IndexError(page_number)
+
+        start, end = self._offsets[page_number], self._offsets[page_number + 1]
+        return list(zip(range(start, end), self.entries[start:end]))
+
+    async def format_page(self, menu, entries):
+        embed = getattr(menu, 'embed', None)
+        embed = embed.copy() if embed is not None else disnake.Embed(colour=disnake.Colour.blurple())
+
+        if self.fields:
+            embed.clear_fields()
+            for _, (name, value) in entries:
+                embed.add_field(
+                    name=str(name)[:self.FIELD_NAME_LIMIT],
+                    value=str(value)[:self.FIELD_VALUE_LIMIT],
+                    inline=False
+                )
+        else:
+            description = '\n'.join(self._line(index, entry) for index, entry in entries)
+            embed.description = description[:self.budget]
+
+        maximum = self.get_max_pages()
+        if maximum > 1:
+            embed.set_footer(text=f'Page {menu.current_page + 1}/{maximum} ({len(self.entries)} entries)')
+
+        return embed
+
+
+class SizedPages(RoboPages):
+    """Like SimplePages, but the pages are as full as the embed limits allow instead of ``per_page`` long."""
+
+    def __init__(self, ctx, entries, *, fields=False, numbered=True, color=None, compact=False):
+        super().__init__(SizedPageSource(entries, fields=fields, numbered=numbered), ctx=ctx, compact=compact)
+        if color is None:
+            color = disnake.Color.blurple()
+        self.embed = disnake.Embed(colour=color)
+
+
 class EmbedPaginator(disnake.ui.View):
+    """Paginates over embeds.
+
+    ``embeds`` can either be a list of already built embeds, a function that takes
+    the page number and returns (or is a coroutine that returns) its embed, in which case
+    ``length`` is required, or an async iterator of embeds. Built embeds are only made the
+    first time their page is shown, and a factory's are kept in a cache of ``cache_size`` pages.
+    Since an iterator can't be rewound, everything pulled from one is kept, and unless
+    ``length`` is given the number of pages is only known once it's exhausted.
+    """
+
     def __init__(
         self,
         ctx: Context,
-        embeds: List[disnake.Embed],
+        embeds: List[disnake.Embed] | Callable[[int], disnake.Embed | Awaitable[disnake.Embed]] | AsyncIterator[disnake.Embed],
         *,
-        timeout: float = 180.0
+        length: Optional[int] = None,
+        cache_size: int = 10,
+        timeout: float = 180.0,
+        edit_delay: float = 0.35
     ):
         super().__init__(timeout=timeout)
         self.ctx: Context = ctx
-        self.embeds: List[disnake.Embed] = embeds
+        self.embeds = embeds
+        self.message: Optional[disnake.Message] = None
+
+        self._factory: Optional[Callable[[int], disnake.Embed | Awaitable[disnake.Embed]]] = None
+        self._iterator: Optional[AsyncIterator[disnake.Embed]] = None
+        self._built: _LRUCache = _LRUCache(cache_size)
+        self._pulled: List[disnake.Embed] = []
+        # An async generator can't be advanced by two callers at once.
+        self._pull_lock = asyncio.Lock()
+        self._length: Optional[int] = length
+
+        if isinstance(embeds, (list, tuple)):
+            self._length = len(embeds)
+        elif hasattr(embeds, '__aiter__'):
+            self._iterator = embeds.__aiter__()
+        elif callable(embeds):
+            if length is None:
+                raise TypeError("Argument 'length' is required when 'embeds' is a function.")
+            self._factory = embeds
+        else:
+            raise TypeError(
+                "Argument 'embeds' must be of type 'list[disnake.Embed]', a function "
+                f"or an async iterator, not {embeds.__class__}"
+            )
 
         self.current_page = 0
+        self._pending_page: Optional[int] = None
+        self._edits = _CoalescedEdit(edit_delay)
+
+    @property
+    def length(self) -> Optional[int]:
+        """The number of pages, ``None`` while it's not known yet."""
+
+        return self._length
+
+    async def get_embed(self, page_number: int) -> Optional[disnake.Embed]:
+        """|coro|
+        Returns the embed of the page, building it if needed, or ``None`` if there's no such page.
+        """
+
+        if page_number < 0 or (self._length is not None and page_number >= self._length):
+            return None
+
+        if self._factory is not None:
+            embed = self._built.get(page_number)
+            if embed is None:
+                embed = await disnake.utils.maybe_coroutine(self._factory, page_number)
+                self._built.put(page_number, embed)
+            return embed
+
+        elif self._iterator is not None or self._pulled:
+            if len(self._pulled) <= page_number:
+                async with self._pull_lock:
+                    # Someone else may have pulled it, or exhausted the iterator, while this was waiting.
+                    while len(self._pulled) <= page_number and self._iterator is not None:
+                        try:
+                            self._pulled.append(await self._iterator.__anext__())
+                        except StopAsyncIteration:
+                            self._length = len(self._pulled)
+                            self._iterator = None
+            if page_number < len(self._pulled):
+                return self._pulled[page_number]
+            return None
+
+        return self.embeds[page_number]
+
+    @property
+    def _base_page(self) -> int:
+        return self._pending_page if self._pending_page is not None else self.current_page
+
+    def _footer(self, page_number: int) -> str:
+        return f'Page {page_number + 1}/{self._length if self._length is not None else "?"}'
 
     async def interaction_check(self, interaction: MessageInteraction) -> bool:
         if interaction.user and interaction.user.id in (self.ctx.bot._owner_id, self.ctx.author.id):
+            paginator_sessions.touch(self)
             return True
         await interaction.response.send_message(
             'This pagination menu cannot be controlled by you, sorry!',
@@ -381,25 +1219,53 @@ class EmbedPaginator(disnake.ui.View):
         )
         return False
 
+    def stop(self) -> None:
+        paginator_sessions.remove(self)
+        super().stop()
+
     async def on_timeout(self) -> None:
+        paginator_sessions.remove(self)
+        self._edits.cancel()
         if self.message:
             await self.message.edit(view=None)
 
     async def show_page(self, inter: MessageInteraction, page_number: int):
+        if self._length is None and page_number >= 0:
+            # The only way to know if the page exists is pulling it.
+            await self.get_embed(page_number)
+
         if (
             (page_number < 0) or
-            (page_number > len(self.embeds) - 1)
+            (page_number > self._length - 1 if self._length is not None else False)
         ):
             if not inter.response.is_done():
                 await inter.response.defer()
             return
-        self.current_page = page_number
-        embed = self.embeds[page_number]
-        embed.set_footer(text=f'Page {self.current_page + 1}/{len(self.embeds)}')
+        self._pending_page = page_number
+
         if inter.response.is_done():
-            await self.message.edit(embed=embed)
+            if self.message is None:
+                return
+            edit = self.message.edit
         else:
-            await inter.response.edit_message(embed=embed)
+            await inter.response.defer()
+            edit = inter.edit_original_message
+
+        async def render() -> Dict[str, Any]:
+            try:
+                embed = await self.get_embed(page_number)
+            finally:
+                self._pending_page = None
+            if embed is None:
+                return {}
+            self.current_page = page_number
+            embed.set_footer(text=self._footer(page_number))
+            return {'embed': embed}
+
+        async def on_error(error: Exception) -> None:
+            await self.on_error(error, _clicked_item(self, inter), inter)
+
+        self._edits.push(edit, render, on_error)
 
     @disnake.ui.button(label='≪', style=disnake.ButtonStyle.grey)
     async def go_to_first_page(self, button: disnake.ui.Button, interaction: MessageInteraction):
@@ -411,24 +1277,29 @@ class EmbedPaginator(disnake.ui.View):
     async def go_to_previous_page(self, button: disnake.ui.Button, interaction: MessageInteraction):
         """Go to the previous page."""
 
-        await self.show_page(interaction, self.current_page - 1)
+        await self.show_page(interaction, self._base_page - 1)
 
     @disnake.ui.button(label='Next', style=disnake.ButtonStyle.blurple)
     async def go_to_next_page(self, button: disnake.ui.Button, interaction: MessageInteraction):
         """Go to the next page."""
 
-        await self.show_page(interaction, self.current_page + 1)
+        await self.show_page(interaction, self._base_page + 1)
 
     @disnake.ui.button(label='≫', style=disnake.ButtonStyle.grey)
     async def go_to_last_page(self, button: disnake.ui.Button, interaction: MessageInteraction):
         """Go to the last page."""
 
-        await self.show_page(interaction, len(self.embeds) - 1)
+        if self._length is None:
+            # This drains the iterator.
+            while await self.get_embed(len(self._pulled)) is not None:
+                pass
+        await self.show_page(interaction, self._length - 1)
 
     @disnake.ui.button(label='Quit', style=disnake.ButtonStyle.red)
     async def stop_pages(self, button: disnake.ui.Button, interaction: MessageInteraction):
         """Stops the pagination session."""
 
+        self._edits.cancel()
         await interaction.response.defer()
         await interaction.delete_original_message()
         self.stop()
@@ -441,9 +1312,194 @@ class EmbedPaginator(disnake.ui.View):
         elif ref is True:
             method = self.ctx.better_reply
 
-        if len(self.embeds) == 1:
-            return await method(embed=self.embeds[0])
+        embed = await self.get_embed(0)
+        if embed is None:
+            return
+        if self._length is None:
+            # Pull the second page as well to know whether there's anything to paginate.
+            await self.get_embed(1)
+
+        if self._length == 1:
+            return await method(embed=embed)
+
+        embed.set_footer(text=self._footer(0))
+        self.message = await method(embed=embed, view=self)
+        paginator_sessions.add(self)
+
+
+# How many pages a CursorPageSource remembers the boundaries of.
+MAX_CURSOR_ANCHORS = 64
+
+
+class CursorPageSource(menus.PageSource):
+    """A page source that reads the pages straight from a Motor collection.
+
+    The first page, the last one and any page next to one already seen are found with a range query
+    on ``key`` (ties broken by ``_id``) from the edge of that page, which costs the same wherever it is.
+    There's no keyset way to land on a page further away than that, since where it starts isn't known
+    until the ones before it were read. Jumping there (a page number typed in, or a page whose neighbours
+    were forgotten) starts from the closest page seen and uses ``skip`` to get over the pages in between.
+    That's still a single query, but the server walks ``distance * per_page`` index entries for it,
+    as many as reading those pages one by one would, just without sending them.
+    Only the page being shown plus the one after it, which is fetched in the background,
+    are kept in memory, so it doesn't matter how big the collection is.
+    Subclasses have to implement ``format_page``.
+
+    Parameters
+    ----------
+        collection: :class:`motor.motor_asyncio.AsyncIOMotorCollection`
+            The collection to page through.
+        filter: Optional[:class:`dict`]
+            The filter the documents must match.
+        key: :class:`str`
+            The field the pages are ordered by, documents without it are not shown.
+        per_page: :class:`int`
+            How many documents a page has.
+        build: Optional[Callable[[:class:`dict`], Any]]
+            Called with every raw document before it's handed to ``format_page``,
+            e.g. ``Homework.build_from_mongo``.
+    """
+
+    def __init__(
+        self,
+        collection,
+        filter: Optional[dict] = None,
+        *,
+        key: str = '_id',
+        per_page: int = 12,
+        build: Optional[Callable[[dict], Any]] = None
+    ):
+        self.collection = collection
+        self.key = key
+        self.per_page = per_page
+        self.build = build
+
+        self.filter = dict(filter or {})
+        if key != '_id':
+            self.filter = {'$and': [self.filter, {key: {'$ne': None}}]} if self.filter else {key: {'$ne': None}}
+        self.sort = [(key, 1), ('_id', 1)] if key != '_id' else [('_id', 1)]
+
+        self.count = 0
+        self._exact_count = bool(self.filter)
+        # The first and last position of the pages we've seen recently, that's all we need to find the others.
+        self._anchors: OrderedDict[int, Tuple[tuple, tuple]] = OrderedDict()
+        self._pages: OrderedDict[int, List[Any]] = OrderedDict()
+        self._fetching: Dict[int, asyncio.Task] = {}
+
+    async def prepare(self):
+        if self.filter:
+            self.count = await self.collection.count_documents(self.filter)
+        else:
+            # Metadata only, doesn't even touch the documents.
+            self.count = await self.collection.estimated_document_count()
+
+    def is_paginating(self) -> bool:
+        return self.count > self.per_page
+
+    def get_max_pages(self) -> int:
+        return max(1, math.ceil(self.count / self.per_page))
+
+    def _position(self, raw: dict) -> tuple:
+        if self.key == '_id':
+            return (raw['_id'],)
+        return (raw.get(self.key), raw['_id'])
+
+    def _range(self, position: tuple, op: str) -> dict:
+        if self.key == '_id':
+            condition = {'_id': {op: position[0]}}
+        else:
+            value, _id = position
+            condition = {'$or': [{self.key: {op: value}}, {self.key: value, '_id': {op: _id}}]}
+        return {'$and': [self.filter, condition]} if self.filter else condition
+
+    async def _query(self, filter: dict, *, reverse: bool = False, skip: int = 0, limit: int) -> List[dict]:
+        sort = [(key, -direction) for key, direction in self.sort] if reverse else self.sort
+        cursor = self.collection.find(filter).sort(sort)
+        if skip:
+            cursor = cursor.skip(skip)
+        docs = await cursor.limit(limit).to_list(length=limit)
+        if reverse:
+            docs.reverse()
+        return docs
+
+    async def _last_page_size(self, page_number: int) -> int:
+        if not self._exact_count:
+            # The estimate from prepare can be stale, the last page has to know exactly how many it has.
+            self.count = await self.collection.count_documents(self.filter)
+            self._exact_count = True
+        return self.count - page_number * self.per_page
+
+    async def _fetch(self, page_number: int) -> List[dict]:
+        # Start from whichever is closest, the first page or a page we've seen on either side.
+        below = max((n for n in self._anchors if n < page_number), default=None)
+        above = min((n for n in self._anchors if n > page_number), default=None)
+        distances = {'start': page_number}
+        if below is not None:
+            distances['below'] = page_number - below - 1
+        if above is not None:
+            distances['above'] = above - page_number - 1
+        origin = min(distances, key=distances.get)
+
+        if page_number == self.get_max_pages() - 1 and page_number > 0 and distances[origin] > 0:
+            size = await self._last_page_size(page_number)
+            # The estimate promised more pages than there are.
+            docs = await self._query(self.filter, reverse=True, limit=size) if size > 0 else []
+        elif origin == 'start':
+            docs = await self._query(self.filter, skip=page_number * self.per_page, limit=self.per_page)
+        elif origin == 'below':
+            after = self._anchors[below][1]
+            docs = await self._query(
+                self._range(after, '$gt'), skip=distances['below'] * self.per_page, limit=self.per_page
+            )
+        else:
+            before = self._anchors[above][0]
+            docs = await self._query(
+                self._range(before, '$lt'), reverse=True, skip=distances['above'] * self.per_page, limit=self.per_page
+            )
+
+        if docs:
+            self._anchors[page_number] = (self._position(docs[0]), self._position(docs[-1]))
+            self._anchors.move_to_end(page_number)
+            while len(self._anchors) > MAX_CURSOR_ANCHORS:
+                self._anchors.popitem(last=False)
+        return docs
+
+    async def _load(self, page_number: int) -> List[Any]:
+        docs = await self._fetch(page_number)
+        if not docs:
+            raise IndexError(page_number)
+        entries = [self.build(doc) for doc in docs] if self.build else docs
+
+        self._pages[page_number] = entries
+        while len(self._pages) > 2:
+            self._pages.popitem(last=False)
+        return entries
+
+    def _prefetch(self, page_number: int) -> None:
+        if page_number >= self.get_max_pages() or page_number in self._pages or page_number in self._fetching:
+            return
+
+        def done(task: asyncio.Task) -> None:
+            self._fetching.pop(page_number, None)
+            if not task.cancelled():
+                # Retrieve it so it doesn't get logged, get_page fetches the page again anyway.
+                task.exception()
+
+        task = asyncio.create_task(self._load(page_number))
+        self._fetching[page_number] = task
+        task.add_done_callback(done)
+
+    async def get_page(self, page_number: int) -> List[Any]:
+        if page_number in self._fetching:
+            try:
+                entries = await asyncio.shield(self._fetching[page_number])
+            except Exception:
+                entries = await self._load(page_number)
+        elif page_number in self._pages:
+            entries = self._pages[page_number]
+            self._pages.move_to_end(page_number)
+        else:
+            entries = await self._load(page_number)
 
-        embed = self.embeds[0]
-        embed.set_footer(text=f'Page 1/{len(self.embeds)}')
-        self.message = await method(embed=embed, view=self)
\ No newline at end of file
+        self._prefetch(page_number + 1)
+        return entries
@@ -0,0 +1,186 @@
+import asyncio
+import heapq
+import json
+import os
+import time
+from typing import Any, Optional
+
+import disnake
+
+from .helpers import _delete_messages
+
+__all__ = (
+    'DeletionScheduler',
+    'deletion_scheduler',
+)
+
+# Deletions that are due this close to each other are done together, so they can be bulk deleted.
+BATCH_WINDOW = 1.0
+# How long to wait before writing the pending deletions to disk, so a burst of them means one write.
+SAVE_DELAY = 2.0
+
+
+class DeletionScheduler:
+    """Owns every delayed message deletion with a single timer.
+
+    The deletions are kept in a heap ordered by their deadline and only the earliest one
+    has a timer armed, so thousands of pending deletions cost as much as one. When it fires,
+    everything that is due is taken out at once and deleted through the same engine
+    as :func:`utils.try_delete`, which groups them per channel and bulk deletes them.
+
+    Parameters
+    ----------
+        path: Optional[:class:`str`]
+            The JSON file to keep the pending deletions in, so they survive a restart.
+            Nothing is saved if this is ``None``.
+    """
+
+    def __init__(self, *, path: Optional[str] = None):
+        self.path = path
+        self._heap: list[tuple[float, int]] = []
+        # message id -> (deadline, message)
+        self._pending: dict[int, tuple[float, Any]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at: Optional[float] = None
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self._loaded = False
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._pending
+
+    def schedule(self, messages: list, delay: float | int) -> None:
+        """Deletes the ``messages`` in ``delay`` seconds.
+
+        A message that's already scheduled keeps whichever deadline comes first.
+        """
+
+        when = time.time() + max(delay, 0)
+        for message in messages:
+            current = self._pending.get(message.id)
+            if current is not None and current[0] <= when:
+                continue
+            self._pending[message.id] = (when, message)
+            heapq.heappush(self._heap, (when, message.id))
+
+        self._arm()
+        self._schedule_save()
+
+    def cancel(self, message_id: int) -> bool:
+        """Forgets about the deletion of the message, returns whether it was scheduled."""
+
+        # The heap entry stays there and is skipped when it comes up.
+        if self._pending.pop(message_id, None) is None:
+            return False
+        self._schedule_save()
+        return True
+
+    def _arm(self) -> None:
+        while self._heap and self._pending.get(self._heap[0][1], (None,))[0] != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+        if not self._heap:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = self._timer_at = None
+            return
+
+        when = self._heap[0][0]
+        if self._timer is not None and self._timer_at == when:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+
+        loop = asyncio.get_running_loop()
+        self._timer_at = when
+        self._timer = loop.call_later(max(when - time.time(), 0), self._fire)
+
+    def _fire(self) -> None:
+        self._timer = self._timer_at = None
+        limit = time.time() + BATCH_WINDOW
+        due = []
+        while self._heap and self._heap[0][0] <= limit:
+            when, message_id = heapq.heappop(self._heap)
+            pending = self._pending.get(message_id)
+            if pending is not None and pending[0] == when:
+                del self._pending[message_id]
+                due.append(pending[1])
+
+        if due:
+            task = asyncio.create_task(_delete_messages(due))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            self._schedule_save()
+        self._arm()
+
+    def _schedule_save(self) -> None:
+        if self.path is None or self._save_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._save_handle = loop.call_later(SAVE_DELAY, self.save)
+
+    def save(self) -> None:
+        """Writes the pending deletions to :attr:`path`."""
+
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        if self.path is None:
+            return
+
+        data = [[when, message.channel.id, message_id] for message_id, (when, message) in self._pending.items()]
+        # Written next to it first so a crash never leaves half a file behind.
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def load(self, bot: disnake.Client) -> int:
+        """Schedules again the deletions saved in :attr:`path`, the ones whose time passed are done right away.
+
+        Return
+        ------
+            :class:`int`
+                How many deletions were loaded.
+        """
+
+        if self._loaded or self.path is None:
+            return 0
+        self._loaded = True
+
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+
+        channels = {}
+        for when, channel_id, message_id in data:
+            channel = channels.get(channel_id)
+            if channel is None:
+                channel = channels[channel_id] = bot.get_channel(channel_id) or bot.get_partial_messageable(channel_id)
+            current = self._pending.get(message_id)
+            if current is None or when < current[0]:
+                self._pending[message_id] = (when, channel.get_partial_message(message_id))
+                heapq.heappush(self._heap, (when, message_id))
+
+        self._arm()
+        return len(data)
+
+    async def close(self) -> None:
+        """|coro|
+        Stops the timer, saves what's still pending and waits for the deletions that already started.
+        """
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = self._timer_at = None
+        self.save()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+deletion_scheduler = DeletionScheduler()
@@ -1,7 +1,15 @@
+import asyncio
 import datetime
+import functools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, List, Tuple
+import numpy as np
 import parsedatetime as pdt
 from dateutil.relativedelta import relativedelta
 from .formats import plural, human_join, format_dt as format_dt
+from . import dateparse
 from disnake.ext import commands
 import re
 
@@ -11,16 +19,138 @@ units['minutes'].append('mins')
 units['seconds'].append('secs')
 
 __all__ = (
+    'ParseCache',
     'ShortTime',
     'HumanTime',
     'Time',
     'FutureTime',
     'UserFriendlyTime',
     'human_timedelta',
+    'human_timedeltas',
     'format_relative',
 )
 
 
+# How long parsedatetime gets before giving up, and the longest input it's given.
+PARSE_TIMEOUT = 2.0
+MAX_TIME_LENGTH = 128
+MAX_ARGUMENT_LENGTH = 512
+
+# parsedatetime is slow and its worst cases are really slow, so it runs here instead of on the event loop.
+# A parse that times out can't be stopped, but it only holds up one of these threads.
+_parser_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='time-parser')
+_local = threading.local()
+
+
+def _calendar() -> pdt.Calendar:
+    # Calendars aren't thread safe, every thread gets its own.
+    calendar = getattr(_local, 'calendar', None)
+    if calendar is None:
+        calendar = _local.calendar = pdt.Calendar(version=pdt.VERSION_CONTEXT_STYLE)
+    return calendar
+
+
+async def _run_parser(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_parser_pool, functools.partial(func, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(future, timeout=PARSE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise commands.BadArgument('That took too long to understand, try e.g. "tomorrow" or "3 days".') from None
+
+
+def _check_length(argument: str, limit: int) -> None:
+    if len(argument) > limit:
+        raise commands.BadArgument(f'That is too long, keep it under {limit} characters.')
+
+
+# Markers stored in a ParseCache instead of an offset.
+_ANCHORED = object()
+_INVALID = object()
+
+
+def _naive(dt: datetime.datetime) -> datetime.datetime:
+    # parsedatetime only ever hands back naive datetimes.
+    return dt.replace(tzinfo=None) if dt.tzinfo is not None else dt
+
+
+class ParseCache:
+    """A bounded LRU of natural language parse results, stored relative to the time they were parsed at.
+
+    A phrase like "3 days" or "mâine" always means the same offset from now, so only that offset
+    is kept and adding it to the current time gives the same result as parsing it again.
+    Whether a phrase is relative is found out by parsing it a second time against a reference time
+    moved by :attr:`PROBE`: if the result moved by exactly as much, it's relative. Phrases that
+    aren't ("at 8", "june 5th") or whose length depends on the calendar (months and years) are remembered
+    as anchored, so they're parsed normally from then on without being probed again.
+    """
+
+    # Moves every unit, so anything pinned to a time or a date doesn't move by exactly this.
+    PROBE = datetime.timedelta(days=1, hours=1, minutes=1, seconds=1)
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        # The parsing happens in worker threads.
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {'size': len(self), 'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate}
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if value is _ANCHORED:
+                # It still has to be parsed, that's not a hit.
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def peek(self, key: Hashable) -> Any:
+        # Like get, without counting or refreshing anything.
+        with self._lock:
+            return self._entries.get(key)
+
+    def is_resolved(self, key: Hashable) -> bool:
+        """Whether ``key`` can be answered without parsing it."""
+
+        value = self.peek(key)
+        return value is not None and value is not _ANCHORED
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    @staticmethod
+    def is_calendar_dependent(status: pdt.pdtContext) -> bool:
+        return bool(status.accuracy & (pdt.pdtContext.ACU_YEAR | pdt.pdtContext.ACU_MONTH))
+
+
 class ShortTime:
     compiled = re.compile("""(?:(?P<years>[0-9])(?:years?|an|ani|yrs|yr|y))?             # e.g. 2y
                              (?:(?P<months>[0-9]{1,2})(?:months?|luni|luna|lună|month|mo))?     # e.g. 2months
@@ -46,24 +176,78 @@ class ShortTime:
 
 
 class HumanTime:
-    calendar = pdt.Calendar(version=pdt.VERSION_CONTEXT_STYLE)
+    parse_cache = ParseCache()
 
     def __init__(self, argument, *, now=None):
         now = now or datetime.datetime.utcnow()
-        dt, status = self.calendar.parseDT(argument, sourceTime=now)
+        _check_length(argument, MAX_TIME_LENGTH)
+        dt = self.parse(argument, now)
+
+        self.dt = dt
+        self._past = dt < now
+
+    @classmethod
+    def _parse(cls, argument: str, now: datetime.datetime) -> Tuple[datetime.datetime, pdt.pdtContext]:
+        dt, status = _calendar().parseDT(argument, sourceTime=now)
         if not status.hasDateOrTime:
             raise commands.BadArgument('invalid time provided, try e.g. "tomorrow" or "3 days"')
 
         if not status.hasTime:
             # replace it with the current time
             dt = dt.replace(hour=now.hour, minute=now.minute, second=now.second, microsecond=now.microsecond)
+        return dt, status
 
-        self.dt = dt
-        self._past = dt < now
+    @classmethod
+    def parse(cls, argument: str, now: datetime.datetime) -> datetime.datetime:
+        # The common Romanian and English phrases don't need parsedatetime at all.
+        match = dateparse.parse(argument, now=_naive(now), whole=True)
+        if match is not None:
+            return match.dt
+
+        key = cls._key(argument)
+        cached = cls.parse_cache.get(key)
+        if cached is _INVALID:
+            raise commands.BadArgument('invalid time provided, try e.g. "tomorrow" or "3 days"')
+        elif isinstance(cached, datetime.timedelta):
+            return _naive(now) + cached
+
+        try:
+            dt, status = cls._parse(argument, now)
+        except commands.BadArgument:
+            cls.parse_cache.put(key, _INVALID)
+            raise
+
+        if cached is None:
+            try:
+                later, _ = cls._parse(argument, now + ParseCache.PROBE)
+            except (commands.BadArgument, ValueError):
+                later = None
+            if later is not None and later - dt == ParseCache.PROBE and not ParseCache.is_calendar_dependent(status):
+                cls.parse_cache.put(key, dt - _naive(now))
+            else:
+                cls.parse_cache.put(key, _ANCHORED)
+        return dt
+
+    @staticmethod
+    def _key(argument: str) -> str:
+        return ' '.join(argument.casefold().split())
+
+    @classmethod
+    def is_cheap(cls, argument: str, now: datetime.datetime) -> bool:
+        """Whether parsing ``argument`` doesn't need parsedatetime, and so isn't worth leaving the event loop for."""
+
+        return (
+            dateparse.parse(argument, now=_naive(now), whole=True) is not None or
+            cls.parse_cache.is_resolved(cls._key(argument))
+        )
 
     @classmethod
     async def convert(cls, ctx, argument):
-        return cls(argument, now=ctx.message.created_at)
+        _check_length(argument, MAX_TIME_LENGTH)
+        now = ctx.message.created_at
+        if cls.is_cheap(argument, now):
+            return cls(argument, now=now)
+        return await _run_parser(cls, argument, now=now)
 
 
 class Time(HumanTime):
@@ -87,6 +271,10 @@ class FutureTime(Time):
 
 class UserFriendlyTime(commands.Converter):
     """That way quotes aren't absolutely necessary."""
+
+    # The whole argument -> (offset from now, begin, end) of the time in it.
+    parse_cache = ParseCache()
+
     def __init__(self, converter=None, *, default=None):
         if isinstance(converter, type) and issubclass(converter, commands.Converter):
             converter = converter()
@@ -119,32 +307,9 @@ class UserFriendlyTime(commands.Converter):
         obj.default = self.default
         return obj
 
-    async def convert(self, ctx, argument):
-        # Create a copy of ourselves to prevent race conditions from two
-        # events modifying the same instance of a converter
-        result = self.copy()
-        calendar = HumanTime.calendar
-        regex = ShortTime.compiled
-        now = ctx.message.created_at
-
-        match = regex.match(argument)
-        if match is not None and match.group(0):
-            data = {k: int(v) for k, v in match.groupdict(default=0).items()}
-            remaining = argument[match.end():].strip()
-            result.dt = now + relativedelta(**data)
-            return await result.check_constraints(ctx, now, remaining)
-
-        # apparently nlp does not like "from now"
-        # it likes "from x" in other cases though so let me handle the 'now' case
-        if argument.endswith('from now'):
-            argument = argument[:-8].strip()
-
-        if argument[0:2] == 'me':
-            # starts with "me to", "me in", or "me at "
-            if argument[0:6] in ('me to ', 'me in ', 'me at '):
-                argument = argument[6:]
-
-        elements = calendar.nlp(argument, sourceTime=now)
+    @staticmethod
+    def _parse(argument: str, now: datetime.datetime) -> Tuple[datetime.datetime, pdt.pdtContext, int, int]:
+        elements = _calendar().nlp(argument, sourceTime=now)
         if elements is None or len(elements) == 0:
             raise commands.BadArgument('Invalid time provided, try e.g. "tomorrow" or "3 days".')
 
@@ -172,6 +337,80 @@ class UserFriendlyTime(commands.Converter):
         if status.accuracy == pdt.pdtContext.ACU_HALFDAY:
             dt = dt.replace(day=now.day + 1)
 
+        return dt, status, begin, end
+
+    @classmethod
+    def parse(cls, argument: str, now: datetime.datetime) -> Tuple[datetime.datetime, int, int]:
+        """Returns the (naive) datetime in the argument, and where it begins and ends."""
+
+        match = dateparse.parse(argument, now=_naive(now))
+        if match is not None:
+            return match.dt, match.begin, match.end
+
+        # Keyed by the whole argument, where parsedatetime stops depends on every word after the time.
+        cached = cls.parse_cache.get(argument)
+        if cached is _INVALID:
+            raise commands.BadArgument('Invalid time provided, try e.g. "tomorrow" or "3 days".')
+        elif isinstance(cached, tuple):
+            offset, begin, end = cached
+            return _naive(now) + offset, begin, end
+
+        try:
+            dt, status, begin, end = cls._parse(argument, now)
+        except commands.BadArgument as e:
+            if 'inappropriate location' not in str(e):
+                cls.parse_cache.put(argument, _INVALID)
+            raise
+
+        if cached is None:
+            try:
+                later, _, later_begin, later_end = cls._parse(argument, now + ParseCache.PROBE)
+            except (commands.BadArgument, ValueError):
+                later = None
+            if (
+                later is not None and
+                later - dt == ParseCache.PROBE and
+                (later_begin, later_end) == (begin, end) and
+                not ParseCache.is_calendar_dependent(status)
+            ):
+                cls.parse_cache.put(argument, (dt - _naive(now), begin, end))
+            else:
+                cls.parse_cache.put(argument, _ANCHORED)
+        return dt, begin, end
+
+    @classmethod
+    def is_cheap(cls, argument: str, now: datetime.datetime) -> bool:
+        return dateparse.parse(argument, now=_naive(now)) is not None or cls.parse_cache.is_resolved(argument)
+
+    async def convert(self, ctx, argument):
+        # Create a copy of ourselves to prevent race conditions from two
+        # events modifying the same instance of a converter
+        result = self.copy()
+        regex = ShortTime.compiled
+        now = ctx.message.created_at
+
+        match = regex.match(argument)
+        if match is not None and match.group(0):
+            data = {k: int(v) for k, v in match.groupdict(default=0).items()}
+            remaining = argument[match.end():].strip()
+            result.dt = now + relativedelta(**data)
+            return await result.check_constraints(ctx, now, remaining)
+
+        # apparently nlp does not like "from now"
+        # it likes "from x" in other cases though so let me handle the 'now' case
+        if argument.endswith('from now'):
+            argument = argument[:-8].strip()
+
+        if argument[0:2] == 'me':
+            # starts with "me to", "me in", or "me at "
+            if argument[0:6] in ('me to ', 'me in ', 'me at '):
+                argument = argument[6:]
+
+        _check_length(argument, MAX_ARGUMENT_LENGTH)
+        if self.is_cheap(argument, now):
+            dt, begin, end = self.parse(argument, now)
+        else:
+            dt, begin, end = await _run_parser(self.parse, argument, now)
         result.dt = dt.replace(tzinfo=datetime.timezone.utc)
 
         if begin in (0, 1):
@@ -188,33 +427,18 @@ class UserFriendlyTime(commands.Converter):
                 remaining = argument[end:].lstrip(' ,.!')
         elif len(argument) == end:
             remaining = argument[:begin].strip()
+        else:
+            raise commands.BadArgument('Time is either in an inappropriate location, which '
+                                       'must be either at the end or beginning of your input, '
+                                       'or I just flat out did not understand what you meant. Sorry.')
 
         return await result.check_constraints(ctx, now, remaining)
 
 
-def human_timedelta(dt, *, source=None, accuracy=3, brief=False, suffix=True):
-    now = source or datetime.datetime.now(datetime.timezone.utc)
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=datetime.timezone.utc)
-
-    if now.tzinfo is None:
-        now = now.replace(tzinfo=datetime.timezone.utc)
-
-    # Microsecond free zone
-    now = now.replace(microsecond=0)
-    dt = dt.replace(microsecond=0)
-
-    # This implementation uses relativedelta instead of the much more obvious
-    # divmod approach with seconds because the seconds approach is not entirely
-    # accurate once you go over 1 week in terms of accuracy since you have to
-    # hardcode a month as 30 or 31 days.
-    # A query like "11 months" can be interpreted as "!1 months and 6 days"
-    if dt > now:
-        delta = relativedelta(dt, now)
-        suffix = ''
-    else:
-        delta = relativedelta(now, dt)
-        suffix = ' ago' if suffix else ''
+@functools.lru_cache(maxsize=4096)
+def _format_delta(components: Tuple[int, int, int, int, int, int], past: bool, accuracy, brief: bool, suffix: bool) -> str:
+    # components are the years, months, days, hours, minutes and seconds of a relativedelta.
+    suffix = ' ago' if past and suffix else ''
 
     attrs = [
         ('year', 'y'),
@@ -226,13 +450,12 @@ def human_timedelta(dt, *, source=None, accuracy=3, brief=False, suffix=True):
     ]
 
     output = []
-    for attr, brief_attr in attrs:
-        elem = getattr(delta, attr + 's')
+    for (attr, brief_attr), elem in zip(attrs, components):
         if not elem:
             continue
 
         if attr == 'day':
-            weeks = delta.weeks
+            weeks = elem // 7
             if weeks:
                 elem -= weeks * 7
                 if not brief:
@@ -260,5 +483,111 @@ def human_timedelta(dt, *, source=None, accuracy=3, brief=False, suffix=True):
             return ' '.join(output) + suffix
 
 
+def _utc(dt: datetime.datetime) -> datetime.datetime:
+    # Naive datetimes are utc, aware ones are converted to it.
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.astimezone(datetime.timezone.utc)
+
+
+def human_timedelta(dt, *, source=None, accuracy=3, brief=False, suffix=True):
+    # Both ends are taken in utc, so the months and days are counted on utc's calendar
+    # no matter which timezone the datetimes come in.
+    now = _utc(source or datetime.datetime.now(datetime.timezone.utc))
+    dt = _utc(dt)
+
+    # Microsecond free zone
+    now = now.replace(microsecond=0)
+    dt = dt.replace(microsecond=0)
+
+    # This implementation uses relativedelta instead of the much more obvious
+    # divmod approach with seconds because the seconds approach is not entirely
+    # accurate once you go over 1 week in terms of accuracy since you have to
+    # hardcode a month as 30 or 31 days.
+    # A query like "11 months" can be interpreted as "!1 months and 6 days"
+    if dt > now:
+        delta = relativedelta(dt, now)
+        past = False
+    else:
+        delta = relativedelta(now, dt)
+        past = True
+
+    components = (delta.years, delta.months, delta.days, delta.hours, delta.minutes, delta.seconds)
+    return _format_delta(components, past, accuracy, brief, suffix)
+
+
+def _as_datetime64(dts) -> np.ndarray:
+    if isinstance(dts, np.ndarray) and np.issubdtype(dts.dtype, np.datetime64):
+        return dts.astype('datetime64[s]')
+
+    return np.array([_utc(dt).replace(tzinfo=None) for dt in dts], dtype='datetime64[s]')
+
+
+def _add_months(start: np.ndarray, months: np.ndarray) -> np.ndarray:
+    # Same as adding relativedelta(months=...), days past the end of the target month are clipped to it.
+    start_month = start.astype('datetime64[M]')
+    start_day = start.astype('datetime64[D]')
+    target = start_month + months
+    target_first = target.astype('datetime64[D]')
+    length = (target + 1).astype('datetime64[D]') - target_first
+    day = np.minimum(start_day - start_month.astype('datetime64[D]'), length - 1)
+    return (target_first + day).astype('datetime64[s]') + (start - start_day.astype('datetime64[s]'))
+
+
+def human_timedeltas(dts, *, source=None, accuracy=3, brief=False, suffix=True) -> List[str]:
+    """Same as :func:`human_timedelta`, but for many datetimes at once.
+
+    The deltas are worked out for all of them together with numpy instead of a relativedelta each,
+    and every distinct delta is only formatted once (and the formats are cached), so listing
+    hundreds of deadlines costs about as much as formatting a handful of them.
+
+    Parameters
+    ----------
+        dts: Iterable[:class:`datetime.datetime`] | :class:`numpy.ndarray`
+            The datetimes, naive ones are taken as utc and aware ones are converted to it,
+            like :func:`human_timedelta` does. An array of ``datetime64`` is taken as utc too.
+        source: Optional[:class:`datetime.datetime`]
+            The time they're relative to, defaults to now.
+    Return
+    ------
+        list[:class:`str`]
+            The formatted deltas, in the same order as ``dts``.
+    """
+
+    dts = _as_datetime64(dts)
+    if dts.size == 0:
+        return []
+
+    now = source or datetime.datetime.now(datetime.timezone.utc)
+    now = _as_datetime64([now])[0]
+
+    past = dts <= now
+    later = np.where(past, now, dts)
+    earlier = np.where(past, dts, now)
+
+    # The same steps relativedelta takes: count the whole months, step back one if that overshot,
+    # and split whatever is left into days, hours, minutes and seconds.
+    months = (later.astype('datetime64[M]') - earlier.astype('datetime64[M]')).astype(np.int64)
+    anchor = _add_months(earlier, months)
+    overshot = later < anchor
+    if overshot.any():
+        months = np.where(overshot, months - 1, months)
+        anchor = np.where(overshot, _add_months(earlier, months), anchor)
+
+    seconds = (later - anchor).astype(np.int64)
+    years, months = np.divmod(months, 12)
+    days, seconds = np.divmod(seconds, 86400)
+    hours, seconds = np.divmod(seconds, 3600)
+    minutes, seconds = np.divmod(seconds, 60)
+
+    table = np.stack((years, months, days, hours, minutes, seconds, past.astype(np.int64)), axis=1)
+    unique, inverse = np.unique(table, axis=0, return_inverse=True)
+    formatted = [
+        _format_delta(tuple(int(v) for v in row[:6]), bool(row[6]), accuracy, brief, suffix)
+        for row in unique
+    ]
+    return [formatted[i] for i in inverse.reshape(-1)]
+
+
 def format_relative(dt):
     return format_dt(dt, 'R')
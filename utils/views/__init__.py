@@ -1,31 +1,162 @@
 import inspect
-import itertools
+import os
 from textwrap import shorten
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import disnake
 from disnake.ext import commands
 
 import utils
-from utils.paginator import RoboPages
+from utils.fuzzy import TrigramIndex
+from utils.paginator import RoboPages, paginator_sessions
 
 from disnake.ext import menus
 
 
+class HelpIndex:
+    """Everything the help command needs to know about the bot's commands, worked out ahead of time.
+
+    It holds the commands of every cog sorted by their qualified name, how many there are
+    and their signatures, and is updated whenever an extension is loaded, unloaded or reloaded,
+    so showing the help never has to walk the command tree. The category pages are also
+    kept once rendered, until the cog they belong to changes.
+
+    It also has a :class:`TrigramIndex` of the command names, aliases and categories
+    to suggest what was meant when one can't be found, which is rebuilt the first time
+    it's searched after the commands changed.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.commands: Dict[str, List[commands.Command]] = {}
+        self.counts: Dict[str, int] = {}
+        self.signatures: Dict[str, str] = {}
+        self._modules: Dict[str, str] = {}
+        # (cog, prefix, the commands shown, page number) -> embed
+        self._pages: Dict[Tuple[str, str, Tuple[str, ...], int], disnake.Embed] = {}
+        self._search: TrigramIndex = TrigramIndex()
+        self._search_stale = True
+
+    def cog_names(self) -> List[str]:
+        return sorted(self.commands)
+
+    def add_cog(self, cog: commands.Cog) -> None:
+        name = cog.qualified_name
+        self.remove_cog(name)
+
+        cmds = sorted(cog.walk_commands(), key=lambda c: c.qualified_name)
+        self.commands[name] = cmds
+        self.counts[name] = len(cmds)
+        self._modules[name] = cog.__module__
+        for command in cmds:
+            self.signatures[command.qualified_name] = command.signature
+        self._search_stale = True
+
+    def remove_cog(self, name: str) -> None:
+        for command in self.commands.pop(name, ()):
+            self.signatures.pop(command.qualified_name, None)
+        self.counts.pop(name, None)
+        self._modules.pop(name, None)
+        self._pages = {key: embed for key, embed in self._pages.items() if key[0] != name}
+        self._search_stale = True
+
+    def update_extension(self, name: str) -> None:
+        """Re-indexes the cogs of the extension ``name``, to be called after it was (un|re)loaded."""
+
+        def belongs(module: str) -> bool:
+            return module == name or module.startswith(name + '.')
+
+        for cog_name in [cog_name for cog_name, module in self._modules.items() if belongs(module)]:
+            self.remove_cog(cog_name)
+        for cog in self.bot.cogs.values():
+            if belongs(cog.__module__):
+                self.add_cog(cog)
+
+    def rebuild(self) -> None:
+        self.commands.clear()
+        self.counts.clear()
+        self.signatures.clear()
+        self._modules.clear()
+        self._pages.clear()
+        for cog in self.bot.cogs.values():
+            self.add_cog(cog)
+
+    def _build_search(self) -> None:
+        self._search.clear()
+        # Commands that aren't in a cog (like this very help command) are suggested too.
+        for command in self.bot.walk_commands():
+            if command.hidden:
+                continue
+            self._search.add(command.qualified_name, command)
+            for alias in command.aliases:
+                self._search.add(f'{command.full_parent_name} {alias}'.strip(), command)
+        for name in self.commands:
+            self._search.add(name, self.bot.get_cog(name))
+        self._search_stale = False
+
+    def suggest(self, query: str, *, limit: int = 3, threshold: float = 0.3, cogs: bool = False) -> List[str]:
+        """Returns the qualified names of the commands (and categories if ``cogs`` is ``True``)
+        that ``query`` was most likely meant to be, best first.
+        """
+
+        if self._search_stale:
+            self._build_search()
+
+        names = []
+        for value, _ in self._search.search(query, limit=limit + len(self.commands), threshold=threshold):
+            if isinstance(value, commands.Cog) and not cogs:
+                continue
+            names.append(value.qualified_name)
+            if len(names) == limit:
+                break
+        return names
+
+    def get_page(self, key: Tuple[str, str, Tuple[str, ...], int]) -> Optional[disnake.Embed]:
+        embed = self._pages.get(key)
+        return embed.copy() if embed is not None else None
+
+    def put_page(self, key: Tuple[str, str, Tuple[str, ...], int], embed: disnake.Embed) -> None:
+        if key[0] in self.commands:
+            self._pages[key] = embed.copy()
+
+
 class GroupHelpPageSource(menus.ListPageSource):
-    def __init__(self, group: commands.Group | commands.Cog, commands: List[commands.Command], *, prefix: str, aliases: List[str] = None):
+    def __init__(
+        self,
+        group: commands.Group | commands.Cog,
+        commands: List[commands.Command],
+        *,
+        prefix: str,
+        aliases: List[str] = None,
+        index: Optional[HelpIndex] = None
+    ):
         super().__init__(entries=commands, per_page=6)
         self.group = group
         self.prefix = prefix
         self.title = f'{self.group.qualified_name} Commands'
         self.description = ', '.join(self.group.aliases) if aliases else self.group.description
+        # Only give it for cogs, a group's title and description are changed after the source is made.
+        self.index = index
+        self._names = tuple(c.qualified_name for c in self.entries)
+
+    def get_signature(self, command: commands.Command) -> str:
+        if self.index is not None and command.qualified_name in self.index.signatures:
+            return self.index.signatures[command.qualified_name]
+        return command.signature
 
     async def format_page(self, menu, commands):
+        key = (self.group.qualified_name, self.prefix, self._names, menu.current_page)
+        if self.index is not None:
+            embed = self.index.get_page(key)
+            if embed is not None:
+                return embed
+
         embed = disnake.Embed(title=self.title, description=self.description, color=utils.blurple)
 
         for command in commands:
-            if command.signature:
-                signature = f'```{self.prefix}{command.qualified_name} {command.signature}\n```'
+            command_signature = self.get_signature(command)
+            if command_signature:
+                signature = f'```{self.prefix}{command.qualified_name} {command_signature}\n```'
             else:
                 signature = f'```{self.prefix}{command.qualified_name}\n```'
             embed.add_field(name=signature, value=command.short_doc or 'No help given...', inline=False)
@@ -35,16 +166,20 @@ class GroupHelpPageSource(menus.ListPageSource):
             embed.set_author(name=f'Page {menu.current_page + 1}/{maximum} ({len(self.entries)} commands)')
 
         embed.set_footer(text=f'Use "{self.prefix}help <command>" for more info on a command.')
+        if self.index is not None:
+            self.index.put_page(key, embed)
         return embed
 
 
 class HelpSelectMenu(disnake.ui.Select['HelpMenu']):
-    def __init__(self, commands: Dict[commands.Cog, List[commands.Command]], bot: commands.AutoShardedBot):
+    def __init__(self, commands: Dict[commands.Cog, List[commands.Command]], bot: commands.Bot, author_id: int):
         super().__init__(
             placeholder='Select a category...',
             min_values=1,
             max_values=1,
             row=0,
+            # Keeps working once the menu isn't alive anymore, see help_source.
+            custom_id=paginator_sessions.select_custom_id('help', author_id),
         )
         self.commands = commands
         self.bot = bot
@@ -65,7 +200,7 @@ class HelpSelectMenu(disnake.ui.Select['HelpMenu']):
                 description = shorten(description, 100)
             emoji = getattr(cog, 'display_emoji', None)
             self.add_option(
-                label=cog.qualified_name + ' [' + str(len(list(cog.walk_commands()))) + ']',
+                label=cog.qualified_name + ' [' + str(self.bot.help_index.counts.get(cog.qualified_name, 0)) + ']',
                 value=cog.qualified_name,
                 description=description,
                 emoji=emoji
@@ -75,7 +210,7 @@ class HelpSelectMenu(disnake.ui.Select['HelpMenu']):
         assert self.view is not None
         value = self.values[0]
         if value == '__index':
-            await self.view.rebind(FrontPageSource(), interaction)
+            await self.view.rebind(FrontPageSource(self.view.ctx.clean_prefix), interaction, location=value)
         else:
             cog = self.bot.get_cog(value)
             if cog is None:
@@ -87,31 +222,59 @@ class HelpSelectMenu(disnake.ui.Select['HelpMenu']):
                 await interaction.response.send_message('This category has no commands for you', ephemeral=True)
                 return
 
-            source = GroupHelpPageSource(cog, commands, prefix=self.view.ctx.clean_prefix)
-            await self.view.rebind(source, interaction)
+            source = GroupHelpPageSource(cog, commands, prefix=self.view.ctx.clean_prefix, index=self.bot.help_index)
+            await self.view.rebind(source, interaction, location=value)
 
 
 class HelpMenu(RoboPages):
-    def __init__(self, source: menus.PageSource, ctx: commands.Context):
-        super().__init__(source, ctx=ctx, compact=True)
+    """The help menu, its pages keep turning after it timed out or the bot restarted.
+
+    ``location`` is what it shows, either ``__index`` for the front page or the name of a category.
+    The pages it shows then come from :func:`help_source`. Groups aren't served like that.
+    """
+
+    def __init__(self, source: menus.PageSource, ctx: commands.Context, *, location: Optional[str] = None):
+        source_key = None
+        if location is not None:
+            source_key = ('help', location)
+            try:
+                self._check_source_key(source_key, ctx.author.id)
+            except ValueError:
+                source_key = None
+        super().__init__(source, ctx=ctx, compact=True, source_key=source_key)
 
     def add_categories(self, commands: Dict[commands.Cog, List[commands.Command]]) -> None:
         self.clear_items()
-        self.add_item(HelpSelectMenu(commands, self.ctx.bot))
+        self.add_item(HelpSelectMenu(commands, self.ctx.bot, self.ctx.author.id))
         self.fill_items()
 
-    async def rebind(self, source: menus.PageSource, interaction: disnake.Interaction) -> None:
+    async def rebind(self, source: menus.PageSource, interaction: disnake.Interaction, *, location: str) -> None:
+        # Setting the source also drops the pages rendered from the previous one,
+        # and an edit still waiting to show one of those pages mustn't land after this.
+        self._edits.cancel()
+        if self.source_key is not None:
+            try:
+                self.source_key = self._check_source_key(('help', location), self.ctx.author.id)
+            except ValueError:
+                # Too long to be served without the view, so the buttons stop working along with it.
+                self.source_key = None
+                for item in self.children:
+                    if isinstance(item, disnake.ui.Button):
+                        item.custom_id = os.urandom(16).hex()
         self.source = source
         self.current_page = 0
+        self._pending_page = None
 
         await self.source._prepare_once()
-        page = await self.source.get_page(0)
-        kwargs = await self._get_kwargs_from_page(page)
+        kwargs = await self._render_page(0)
         self._update_labels(0)
         await interaction.response.edit_message(**kwargs, view=self)
 
 
 class FrontPageSource(menus.PageSource):
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+
     def is_paginating(self) -> bool:
         # This forces the buttons to appear even in the front page
         return True
@@ -128,12 +291,12 @@ class FrontPageSource(menus.PageSource):
 
     def format_page(self, menu: HelpMenu, page):
         embed = disnake.Embed(title='Bot Help', color=utils.blurple)
-        embed.set_footer(text=f'TIP: You can also use "{"!" if menu.ctx.clean_prefix == "?" else "?"}" as prefix')
+        embed.set_footer(text=f'TIP: You can also use "{"!" if self.prefix == "?" else "?"}" as prefix')
         embed.description = inspect.cleandoc(
             f"""
             Hello! Welcome to the help page.
-            Use "{menu.ctx.clean_prefix}help <command>" for more info on a command.
-            Use "{menu.ctx.clean_prefix}help <category>" for more info on a category.
+            Use "{self.prefix}help <command>" for more info on a command.
+            Use "{self.prefix}help <category>" for more info on a category.
             Use the dropdown menu below to select a category.
             **NOTE:** Some commands may only work in <#938119528464916530>
         """
@@ -177,6 +340,30 @@ class PaginatedHelpCommand(commands.HelpCommand):
 
             await ctx.reraise(error)
 
+    async def filter_commands(self, commands, *, sort=False, key=None):
+        # Same as the default one, except that the results of the checks are cached.
+        if sort and key is None:
+            key = lambda c: c.name  # noqa: E731
+
+        iterator = commands if self.show_hidden else filter(lambda c: not c.hidden, commands)
+        if self.verify_checks is False or (self.verify_checks is None and not self.context.guild):
+            return sorted(iterator, key=key) if sort else list(iterator)
+
+        ret = await utils.check_cache.filter_commands(self.context, iterator)
+        if sort:
+            ret.sort(key=key)
+        return ret
+
+    def command_not_found(self, string):
+        suggestions = self.context.bot.help_index.suggest(string, cogs=True)
+        string = utils.remove_markdown(string)
+        if not suggestions:
+            return f'Nu există nicio comandă sau categorie numită `{string}`.'
+        return (
+            f'Nu există nicio comandă sau categorie numită `{string}`. '
+            f'Ai vrut să spui {utils.human_join([f"`{name}`" for name in suggestions])}?'
+        )
+
     def get_command_signature(self, command):
         parent = command.full_parent_name
         cmd = command.name if not parent else f'{parent} {command.name}'
@@ -187,28 +374,27 @@ class PaginatedHelpCommand(commands.HelpCommand):
 
     async def send_bot_help(self, mapping):
         bot = self.context.bot
+        index: HelpIndex = bot.help_index
 
-        def key(command) -> str:
-            cog = command.cog
-            return cog.qualified_name if cog else '\U0010ffff'
-
-        entries: List[commands.Command] = await self.filter_commands(bot.walk_commands(), sort=True, key=key)
-
+        # The index is already grouped by cog and sorted, only the filtering is left to do.
         all_commands: Dict[commands.Cog, List[commands.Command]] = {}
-        for name, children in itertools.groupby(entries, key=key):
-            if name == '\U0010ffff':
-                continue
+        for name in index.cog_names():
+            entries: List[commands.Command] = await self.filter_commands(index.commands[name])
+            if entries:
+                all_commands[bot.get_cog(name)] = entries
 
-            cog: commands.Cog = bot.get_cog(name)
-            all_commands[cog] = sorted(children, key=lambda c: c.qualified_name)
-
-        menu = HelpMenu(FrontPageSource(), ctx=self.context)
+        menu = HelpMenu(FrontPageSource(self.context.clean_prefix), ctx=self.context, location='__index')
         menu.add_categories(all_commands)
         await menu.start(ref=True)
 
     async def send_cog_help(self, cog):
-        entries = await self.filter_commands(cog.walk_commands(), sort=True, key=lambda c: c.qualified_name)
-        menu = HelpMenu(GroupHelpPageSource(cog, entries, prefix=self.context.clean_prefix), ctx=self.context)
+        index: HelpIndex = self.context.bot.help_index
+        cmds = index.commands.get(cog.qualified_name)
+        if cmds is None:
+            cmds = sorted(cog.walk_commands(), key=lambda c: c.qualified_name)
+        entries = await self.filter_commands(cmds)
+        source = GroupHelpPageSource(cog, entries, prefix=self.context.clean_prefix, index=index)
+        menu = HelpMenu(source, ctx=self.context, location=cog.qualified_name)
         await menu.start(ref=True)
 
     def common_command_formatting(self, embed_like, command):
@@ -248,3 +434,25 @@ class PaginatedHelpCommand(commands.HelpCommand):
         self.common_command_formatting(source, group)
         menu = HelpMenu(source, ctx=self.context)
         await menu.start(ref=True)
+
+
+def help_source(bot: commands.Bot, location: str) -> menus.PageSource:
+    """Makes the pages of a :class:`HelpMenu` that isn't alive anymore.
+
+    Nobody's checks can be run from a button, so a category shows every command in it that isn't hidden.
+    """
+
+    prefixes = bot.command_prefix
+    prefix = prefixes if isinstance(prefixes, str) else prefixes[0]
+    if location == '__index':
+        return FrontPageSource(prefix)
+
+    index: HelpIndex = bot.help_index
+    cog = bot.get_cog(location)
+    if cog is None or location not in index.commands:
+        raise LookupError(location)
+    entries = [command for command in index.commands[location] if not command.hidden]
+    return GroupHelpPageSource(cog, entries, prefix=prefix, index=index)
+
+
+paginator_sessions.register_source('help', help_source)